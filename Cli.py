@@ -1,7 +1,15 @@
+import argparse
 import os
 import sys
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
+import data_io
+import instrumentation
 from db_schema import initialize_database
-from models import Category, Product, InventoryLog
+from models import (Category, DatabaseLockedError, Product, InventoryLog, LogPartition,
+                    StockSnapshot, set_lock_policy)
+from reports import Report
 
 def clear_screen():
     """Clear the terminal screen."""
@@ -19,6 +27,31 @@ def pause():
     """Pause execution until user presses Enter."""
     input("\nPress Enter to continue...")
 
+# Rows shown per screen in paged views
+PAGE_SIZE = 20
+
+def print_paged(rows, print_row):
+    """Print rows one screen at a time, asking before each further screen."""
+    rows = iter(rows)
+    page = list(islice(rows, PAGE_SIZE))
+    while page:
+        for row in page:
+            print_row(row)
+        page = list(islice(rows, PAGE_SIZE))
+        if page and input("\n-- Enter for more, 'q' to stop: ").lower() == 'q':
+            break
+
+def print_product_row(product):
+    """Print one product as a table row."""
+    print(f"{product['product_id']:<5} {product['name'][:18]:<20} {product.get('category_name', 'N/A')[:13]:<15} "
+          f"${product['price']:<9.2f} {product['quantity']:<10}")
+
+def print_log_row(log):
+    """Print one inventory log entry as a table row."""
+    timestamp = log['timestamp'].split('.')[0]  # Remove milliseconds
+    print(f"{timestamp:<20} {log['product_name'][:18]:<20} {log['action']:<10} "
+          f"{log['quantity']:<10} {log['notes'][:18] if log['notes'] else '':<20}")
+
 def display_menu():
     """Display the main menu and get user choice."""
     print_header("INVENTORY MANAGEMENT SYSTEM")
@@ -29,18 +62,23 @@ def display_menu():
     print("5. Search Products")
     print("6. View Inventory Log")
     print("7. Manage Categories")
+    print("8. Low Stock Report")
+    print("9. Reports")
+    print("10. Performance Statistics")
     print("0. Exit")
     
-    choice = input("\nEnter your choice (0-7): ")
+    choice = input("\nEnter your choice (0-10): ")
     return choice
 
 def view_products():
     """Display all products in the inventory."""
     print_header("ALL PRODUCTS")
     
-    products = Product.get_all()
+    # Stream products from the database one screen at a time
+    products = Product.iter_all(page_size=PAGE_SIZE)
+    first = next(products, None)
     
-    if not products:
+    if first is None:
         print("No products found in the inventory.")
         return
     
@@ -49,9 +87,7 @@ def view_products():
     print("-" * 60)
     
     # Print each product
-    for product in products:
-        print(f"{product['product_id']:<5} {product['name'][:18]:<20} {product.get('category_name', 'N/A')[:13]:<15} "
-              f"${product['price']:<9.2f} {product['quantity']:<10}")
+    print_paged(chain([first], products), print_product_row)
     
     pause()
 
@@ -96,12 +132,13 @@ def add_product():
     print("\nAvailable Categories:")
     for category in categories:
         print(f"{category['category_id']}. {category['name']}")
+    category_ids = {category['category_id'] for category in categories}
     
     # Validate category selection
     while True:
         try:
             category_id = int(input("\nSelect Category ID: "))
-            if not any(c['category_id'] == category_id for c in categories):
+            if category_id not in category_ids:
                 print("Invalid category ID.")
                 continue
             break
@@ -172,12 +209,13 @@ def update_product():
             print("\nAvailable Categories:")
             for category in categories:
                 print(f"{category['category_id']}. {category['name']}")
+            category_ids = {category['category_id'] for category in categories}
             
             # Validate category selection
             while True:
                 try:
                     category_id = int(input("\nSelect Category ID: "))
-                    if not any(c['category_id'] == category_id for c in categories):
+                    if category_id not in category_ids:
                         print("Invalid category ID.")
                         continue
                     break
@@ -219,14 +257,30 @@ def manage_inventory():
     print("\nChoose action:")
     print("1. Add stock")
     print("2. Remove stock")
+    print("3. Set reorder threshold")
     
-    action_choice = input("\nEnter choice (1-2): ")
+    action_choice = input("\nEnter choice (1-3): ")
     
-    if action_choice not in ['1', '2']:
+    if action_choice not in ['1', '2', '3']:
         print("Invalid choice.")
         pause()
         return
     
+    if action_choice == '3':
+        current = product['reorder_threshold']
+        threshold_input = input(f"Reorder threshold [{'none' if current is None else current}] "
+                                f"(blank for none): ")
+        try:
+            threshold = int(threshold_input) if threshold_input else None
+        except ValueError:
+            print("Invalid threshold format.")
+            pause()
+            return
+        Product.set_reorder_threshold(product_id, threshold)
+        print("\nReorder threshold updated.")
+        pause()
+        return
+    
     # Get quantity change
     try:
         quantity = int(input("Enter quantity: "))
@@ -250,16 +304,102 @@ def manage_inventory():
         action = 'SALE'
         quantity_change = -quantity
     
-    success = Product.update_quantity(product_id, quantity_change, action, notes)
+    updated_product = Product.update_quantity_returning(product_id, quantity_change, action, notes)
     
-    if success:
-        updated_product = Product.get_by_id(product_id)
+    if updated_product:
         print(f"\nInventory updated successfully. New stock: {updated_product['quantity']} units")
     else:
         print("\nFailed to update inventory. Please check quantity.")
     
     pause()
 
+def print_low_stock_alert(alert):
+    """Announce a product crossing its reorder threshold."""
+    if alert['low']:
+        print(f"\n*** Low stock: '{alert['name']}' has {alert['quantity']} units "
+              f"(reorder at {alert['reorder_threshold']}) ***")
+    else:
+        print(f"\n'{alert['name']}' is back above its reorder threshold.")
+
+def view_low_stock():
+    """List products at or below their reorder threshold."""
+    print_header("LOW STOCK REPORT")
+    
+    products = Product.low_stock()
+    if not products:
+        print("No products are at or below their reorder threshold.")
+    else:
+        print(f"{'ID':<5} {'Name':<30} {'Quantity':<10} {'Reorder At':<10}")
+        print("-" * 60)
+        for product in products:
+            print(f"{product['product_id']:<5} {product['name'][:28]:<30} "
+                  f"{product['quantity']:<10} {product['reorder_threshold']:<10}")
+    
+    pause()
+
+def days_ago(days):
+    """Start of the UTC day `days` ago, in the format the log timestamps use."""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d')
+
+def view_reports():
+    """Show stock valuation and movement summaries."""
+    while True:
+        print_header("REPORTS")
+        print("1. Stock Value by Category")
+        print("2. Daily Movements (last 30 days)")
+        print("3. Weekly Movements (last 12 weeks)")
+        print("4. Top Movers (last 30 days)")
+        print("0. Back to Main Menu")
+        
+        choice = input("\nEnter your choice (0-4): ")
+        
+        if choice == '0':
+            return
+        elif choice == '1':
+            print_header("STOCK VALUE BY CATEGORY")
+            rows = Report.valuation_by_category()
+            print(f"{'Category':<20} {'Products':<10} {'Units':<10} {'Value':<15}")
+            print("-" * 60)
+            for row in rows:
+                print(f"{(row['category_name'] or 'Uncategorized')[:18]:<20} {row['products']:<10} "
+                      f"{row['units']:<10} ${row['value']:<14,.2f}")
+            print("-" * 60)
+            print(f"{'Total':<42} ${sum(row['value'] for row in rows):,.2f}")
+        elif choice in ('2', '3'):
+            period, days, title = (('day', 30, "DAILY MOVEMENTS") if choice == '2'
+                                   else ('week', 84, "WEEKLY MOVEMENTS"))
+            print_header(title)
+            start = days_ago(days)
+            print(f"{'Period':<12} {'Action':<10} {'Entries':<10} {'Units':<10} {'Net':<10}")
+            print("-" * 55)
+            for row in Report.movements_by_period(period, start=start):
+                print(f"{row['period']:<12} {row['action']:<10} {row['entries']:<10} "
+                      f"{row['units']:<10} {row['net']:<10}")
+        elif choice == '4':
+            print_header("TOP MOVERS")
+            start = days_ago(30)
+            print(f"{'ID':<5} {'Name':<30} {'Units':<10} {'Movements':<10}")
+            print("-" * 60)
+            for row in Report.top_movers(10, start=start):
+                print(f"{row['product_id']:<5} {(row['name'] or '(deleted)')[:28]:<30} "
+                      f"{row['units']:<10} {row['movements']:<10}")
+        else:
+            print("Invalid choice. Please try again.")
+        
+        pause()
+
+def view_performance_stats():
+    """Show call counts, latencies and slow calls recorded by --instrument."""
+    clear_screen()
+    print_header("PERFORMANCE STATISTICS")
+    
+    if not instrumentation.is_enabled():
+        print("Instrumentation is off. Start the program with --instrument to collect statistics.")
+    else:
+        print(instrumentation.format_report())
+    
+    pause()
+
 def search_products():
     """Search for products by name or description."""
     print_header("SEARCH PRODUCTS")
@@ -285,9 +425,7 @@ def search_products():
     print("-" * 60)
     
     # Print each product
-    for product in products:
-        print(f"{product['product_id']:<5} {product['name'][:18]:<20} {product.get('category_name', 'N/A')[:13]:<15} "
-              f"${product['price']:<9.2f} {product['quantity']:<10}")
+    print_paged(products, print_product_row)
     
     pause()
 
@@ -301,10 +439,7 @@ def view_inventory_log():
     if filter_choice == 'y':
         try:
             product_id = int(input("Enter Product ID: "))
-            logs = InventoryLog.get_by_product(product_id)
-            
-            # Get product name
-            product = Product.get_by_id(product_id)
+            product, logs = InventoryLog.product_history(product_id, page_size=PAGE_SIZE)
             if not product:
                 print(f"No product found with ID: {product_id}")
                 pause()
@@ -319,7 +454,10 @@ def view_inventory_log():
         logs = InventoryLog.get_all(25)  # Limit to last 25 entries
         print("\nLatest 25 Inventory Changes:\n")
     
-    if not logs:
+    logs = iter(logs)
+    first = next(logs, None)
+    
+    if first is None:
         print("No log entries found.")
         pause()
         return
@@ -329,10 +467,7 @@ def view_inventory_log():
     print("-" * 80)
     
     # Print each log entry
-    for log in logs:
-        timestamp = log['timestamp'].split('.')[0]  # Remove milliseconds
-        print(f"{timestamp:<20} {log['product_name'][:18]:<20} {log['action']:<10} "
-              f"{log['quantity']:<10} {log['notes'][:18] if log['notes'] else '':<20}")
+    print_paged(chain([first], logs), print_log_row)
     
     pause()
 
@@ -482,34 +617,153 @@ def delete_category():
     
     pause()
 
-def main():
+def parse_args(argv=None):
+    """Parse command-line arguments; no subcommand means the interactive menu."""
+    parser = argparse.ArgumentParser(description="Inventory Management System")
+    parser.add_argument('--instrument', action='store_true',
+                        help="Record per-method call counts and latencies")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Keep Prometheus metrics in this file (implies --instrument)")
+    parser.add_argument('--busy-timeout', type=int, metavar='MS',
+                        help="How long to wait for another process's write lock")
+    parser.add_argument('--lock-retries', type=int, metavar='N',
+                        help="How many times to retry a write that found the database locked")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    for command, help_text in (('import', "Load records from a CSV or JSON Lines file"),
+                               ('export', "Write records to a CSV or JSON Lines file")):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument('entity', choices=['products', 'categories'])
+        subparser.add_argument('path')
+        subparser.add_argument('--format', choices=['csv', 'jsonl'],
+                               help="File format (default: from the file extension)")
+        if command == 'import':
+            subparser.add_argument('--chunk-size', type=int, default=data_io.DEFAULT_CHUNK_SIZE,
+                                   help="Records per transaction")
+    
+    subparsers.add_parser('snapshot', help="Checkpoint current stock levels")
+    compact = subparsers.add_parser('compact-log', help="Archive log rows covered by snapshots")
+    compact.add_argument('before', help="Archive up to the last snapshot at or before this "
+                                        "time (YYYY-MM-DD [HH:MM:SS])")
+    rotate = subparsers.add_parser('rotate-log', help="Move finished months of the log "
+                                                      "into monthly partitions")
+    rotate.add_argument('--before', help="Partition months before this date (default: now)")
+    detach = subparsers.add_parser('detach-log', help="Export a log partition to its own "
+                                                      "database file and drop it")
+    detach.add_argument('month', help="Partition to detach (YYYY-MM)")
+    detach.add_argument('path', help="Database file to export the entries to")
+    
+    return parser.parse_args(argv)
+
+def run_transfer(args):
+    """Run a non-interactive import or export command."""
+    start = time.perf_counter()
+    rejected = []
+    if args.command == 'import':
+        if args.entity == 'products':
+            count = data_io.import_products(args.path, args.format, args.chunk_size, rejected)
+        else:
+            count = data_io.import_categories(args.path, args.format, args.chunk_size, rejected)
+        verb = "Imported"
+    else:
+        dump = data_io.export_products if args.entity == 'products' else data_io.export_categories
+        count = dump(args.path, args.format)
+        verb = "Exported"
+    elapsed = time.perf_counter() - start
+    print(f"{verb} {count} {args.entity} in {elapsed:.2f}s")
+    if rejected:
+        print(f"Skipped {len(rejected)} invalid records:")
+        for number, reason in rejected[:10]:
+            print(f"  record {number}: {reason}")
+        if len(rejected) > 10:
+            print(f"  ... and {len(rejected) - 10} more")
+
+def run_maintenance(args):
+    """Run a non-interactive snapshot or log maintenance command."""
+    if args.command == 'snapshot':
+        count = StockSnapshot.take()
+        print(f"Snapshot taken for {count} products")
+    elif args.command == 'compact-log':
+        count = StockSnapshot.compact_log(args.before)
+        print(f"Archived {count} inventory log entries")
+    elif args.command == 'rotate-log':
+        count = LogPartition.rotate(args.before)
+        print(f"Moved {count} inventory log entries into monthly partitions")
+    else:
+        count = LogPartition.detach(args.month, args.path)
+        if count is None:
+            print(f"No log partition for {args.month}")
+        else:
+            print(f"Exported {count} inventory log entries to {args.path}")
+
+def main(argv=None):
     """Main application entry point."""
+    args = parse_args(argv)
+    set_lock_policy(busy_timeout=args.busy_timeout, retries=args.lock_retries)
+    
     # Initialize database
     initialize_database()
     
+    if args.instrument or args.metrics_file:
+        instrumentation.enable()
+    
+    def write_metrics():
+        if args.metrics_file:
+            instrumentation.write_prometheus(args.metrics_file)
+    
+    if args.command in ('import', 'export'):
+        run_transfer(args)
+        write_metrics()
+        return
+    if args.command:
+        run_maintenance(args)
+        write_metrics()
+        return
+    
+    # Checkpoint stock levels once a day so history queries stay fast, and
+    # keep only the current month in the live log table
+    StockSnapshot.take_if_due()
+    LogPartition.rotate()
+    Product.subscribe_low_stock(print_low_stock_alert)
+    
     while True:
         choice = display_menu()
         
         if choice == '0':
+            write_metrics()
             print("\nThank you for using the Inventory Management System. Goodbye!")
             sys.exit(0)
-        elif choice == '1':
-            view_products()
-        elif choice == '2':
-            add_product()
-        elif choice == '3':
-            update_product()
-        elif choice == '4':
-            manage_inventory()
-        elif choice == '5':
-            search_products()
-        elif choice == '6':
-            view_inventory_log()
-        elif choice == '7':
-            manage_categories()
-        else:
-            print("Invalid choice. Please try again.")
+        
+        # Another process may hold the write lock for longer than the
+        # retries wait; report it and return to the menu
+        try:
+            if choice == '1':
+                view_products()
+            elif choice == '2':
+                add_product()
+            elif choice == '3':
+                update_product()
+            elif choice == '4':
+                manage_inventory()
+            elif choice == '5':
+                search_products()
+            elif choice == '6':
+                view_inventory_log()
+            elif choice == '7':
+                manage_categories()
+            elif choice == '8':
+                view_low_stock()
+            elif choice == '9':
+                view_reports()
+            elif choice == '10':
+                view_performance_stats()
+            else:
+                print("Invalid choice. Please try again.")
+                pause()
+        except DatabaseLockedError:
+            print("\nThe database is busy with another user's changes. Please try again.")
             pause()
+        write_metrics()
 
 if __name__ == "__main__":
     main()
@@ -1,79 +1,755 @@
+import atexit
+import functools
+import keyword
+import os
+import random
+import re
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from db_schema import (DEFAULT_STORAGE_PROFILE, apply_storage_profile, log_partition,
+                       stored_storage_profile)
+
+DEFAULT_POOL_SIZE = 5
+
+# Bound parameters per statement when expanding IN (...) lists; stays under
+# SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+MAX_SQL_PARAMS = 900
+
+# UPDATE ... RETURNING needs SQLite 3.35; older builds re-read the row instead
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+# How connections wait for locks held by other processes. busy_timeout (ms)
+# overrides the storage profile's; a write method whose transaction still
+# can't get the lock is re-run up to `retries` times, sleeping `backoff`
+# seconds (doubling up to `max_backoff`, with jitter) between attempts.
+_lock_policy = {'busy_timeout': None, 'retries': 5, 'backoff': 0.05, 'max_backoff': 1.0}
+_lock_counters = {'retries': 0, 'failures': 0}
+_lock_counters_lock = threading.Lock()
+
+
+class DatabaseLockedError(sqlite3.OperationalError):
+    """A write gave up because another connection kept the database locked."""
+
+
+def _apply_lock_policy(conn):
+    if _lock_policy['busy_timeout'] is not None:
+        conn.execute(f"PRAGMA busy_timeout = {int(_lock_policy['busy_timeout'])}")
+
+
+def set_lock_policy(busy_timeout=None, retries=None, backoff=None, max_backoff=None):
+    """Change how long writes wait for and retry on a locked database.
+    
+    Arguments left as None keep their current values. The busy timeout
+    applies to connections opened afterwards and to idle pooled ones, so
+    call this at startup.
+    """
+    for key, value in (('busy_timeout', busy_timeout), ('retries', retries),
+                       ('backoff', backoff), ('max_backoff', max_backoff)):
+        if value is not None:
+            _lock_policy[key] = value
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        with pool._lock:
+            for conn in pool._idle:
+                _apply_lock_policy(conn)
+
+
+def lock_stats():
+    """Return how many write attempts were retried, and how many gave up, on lock errors."""
+    with _lock_counters_lock:
+        return dict(_lock_counters)
+
+
+def is_lock_error(error):
+    """Whether a sqlite3 error means another connection holds a lock."""
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+def _count_lock_event(counter):
+    with _lock_counters_lock:
+        _lock_counters[counter] += 1
+
+
+def _retry_locked(func):
+    """Re-run a write method whose transaction failed on a lock held elsewhere.
+    
+    The failed transaction has been rolled back by Database, so the whole
+    method runs again. Raises DatabaseLockedError once the retries are used up.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        delay = _lock_policy['backoff']
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if isinstance(e, DatabaseLockedError) or not is_lock_error(e):
+                    raise
+                if attempt >= _lock_policy['retries']:
+                    _count_lock_event('failures')
+                    raise DatabaseLockedError(
+                        f"{e} (gave up after {attempt + 1} attempts)") from e
+            _count_lock_event('retries')
+            attempt += 1
+            # Jitter keeps competing processes from retrying in lockstep
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, _lock_policy['max_backoff'])
+    return wrapper
+
+
+class ConnectionPool:
+    """Keeps a bounded set of open connections to one database file."""
+
+    def __init__(self, db_file, size=DEFAULT_POOL_SIZE, profile=DEFAULT_STORAGE_PROFILE):
+        self.db_file = db_file
+        self.size = size
+        self.profile = profile
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.opened = 0
+        self.acquired = 0
+
+    def _connect(self):
+        # Connections move between threads through the pool, but are only
+        # ever used by one thread at a time.
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Allow access to columns by name
+        apply_storage_profile(conn, self.profile)
+        _apply_lock_policy(conn)
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Return an idle connection, or open a new one if none is usable."""
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError('Connection pool is closed')
+                conn = self._idle.pop() if self._idle else None
+                self.acquired += 1
+                if conn is None:
+                    self.opened += 1
+            if conn is None:
+                return self._connect()
+            if self._is_healthy(conn):
+                return conn
+            conn.close()
+
+    def release(self, conn):
+        """Hand a connection back; it is closed if the pool is already full."""
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                conn.close()  # Unusable; never hand it out again
+                return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def stats(self):
+        """Return checkout counters and the number of idle connections."""
+        with self._lock:
+            return {'size': self.size, 'idle': len(self._idle),
+                    'opened': self.opened, 'acquired': self.acquired}
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Pools inherited from the parent of a forked process; kept referenced so
+# their connections are never closed (or used) in the child
+_inherited_pools = []
+
+
+def _forget_pools_after_fork():
+    """Start a forked child with no pools.
+    
+    SQLite connections must not be used across fork, and closing them in
+    the child could checkpoint or remove the WAL file under the parent, so
+    the inherited pools are set aside untouched.
+    """
+    global _pools_lock
+    _inherited_pools.extend(_pools.values())
+    _pools.clear()
+    _pools_lock = threading.Lock()  # May have been held by another thread at fork time
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
+
+
+def database_profile(db_file):
+    """The storage profile saved in db_file by initialize_database, or the default."""
+    if not os.path.exists(db_file):
+        return DEFAULT_STORAGE_PROFILE
+    conn = sqlite3.connect(db_file)
+    try:
+        return stored_storage_profile(conn) or DEFAULT_STORAGE_PROFILE
+    finally:
+        conn.close()
+
+
+def get_pool(db_file='inventory.db', size=None, profile=None):
+    """Return the shared pool for db_file, creating it on first use.
+    
+    A new pool has DEFAULT_POOL_SIZE connections unless size is given, and
+    uses profile or else the one saved in the database (database_profile).
+    Once the pool exists, passing a different size or profile raises
+    ValueError rather than being silently ignored.
+    """
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None:
+            pool = _pools[db_file] = ConnectionPool(
+                db_file, DEFAULT_POOL_SIZE if size is None else size,
+                profile or database_profile(db_file))
+        elif size is not None and size != pool.size:
+            raise ValueError(f"Pool for {db_file} already exists with size {pool.size}, not {size}")
+        elif profile is not None and profile != pool.profile:
+            raise ValueError(f"Pool for {db_file} already exists with profile "
+                             f"{pool.profile!r}, not {profile!r}")
+        return pool
+
+
+def pool_stats():
+    """Return ConnectionPool.stats() for every open pool, keyed by database file."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {db_file: pool.stats() for db_file, pool in pools.items()}
+
+
+def close_all_pools():
+    """Close every pooled connection, e.g. before the process exits."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
+
+
+# Cursor class for Database connections; instrumentation.py swaps in one
+# that times each statement
+_cursor_factory = sqlite3.Cursor
+
+
+def set_cursor_factory(factory):
+    """Use factory (a sqlite3.Cursor subclass) for cursors opened by Database."""
+    global _cursor_factory
+    _cursor_factory = factory or sqlite3.Cursor
+
 
 class Database:
-    def __init__(self, db_file='inventory.db'):
+    def __init__(self, db_file='inventory.db', pool_size=None, profile=None, write=False):
         self.db_file = db_file
+        self.profile = profile  # None: the profile saved in the database
+        # A write transaction takes the write lock when it begins, so it
+        # waits for other writers up front instead of failing when a read
+        # inside it tries to upgrade
+        self.write = write
+        # A pool_size of 0 opens a fresh connection per use, as before pooling;
+        # None uses the shared pool at whatever size it was created with
+        self.pool = get_pool(db_file, pool_size, profile) if pool_size != 0 else None
         
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_file)
-        self.conn.row_factory = sqlite3.Row  # Allow access to columns by name
-        self.cursor = self.conn.cursor()
+        if self.pool is not None:
+            self.conn = self.pool.acquire()
+        else:
+            self.conn = sqlite3.connect(self.db_file)
+            self.conn.row_factory = sqlite3.Row  # Allow access to columns by name
+            apply_storage_profile(self.conn, self.profile or stored_storage_profile(self.conn)
+                                  or DEFAULT_STORAGE_PROFILE)
+            _apply_lock_policy(self.conn)
+        if self.write:
+            try:
+                self.conn.execute('BEGIN IMMEDIATE')
+            except sqlite3.Error:
+                self._release()
+                raise
+        self.cursor = self.conn.cursor(_cursor_factory)
         return self
+    
+    def _release(self):
+        if self.pool is not None:
+            self.pool.release(self.conn)
+        else:
+            self.conn.close()
         
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.conn.commit()
-        self.conn.close()
+        # The connection goes back even if the commit fails, or a write
+        # transaction would hold its lock until the connection was collected
+        try:
+            self.cursor.close()
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self._release()
+
+
+class Record:
+    """Base of the lightweight row records the models return.
+    
+    A record class is generated for each column list a query returns (see
+    _record_type), with one slot per column, so a row costs a small fixed
+    object rather than a dict with its own hash table. Records read like
+    dicts - record['name'], record.get('name'), 'name' in record, keys(),
+    items(), dict(record) - and by attribute. Caches keep their records to
+    themselves and hand out copies (see CategoryCache), so every record a
+    caller gets is its own to change.
+    """
+    
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+    
+    def __contains__(self, key):
+        return key in self.__slots__
+    
+    def __iter__(self):
+        return iter(self.__slots__)
+    
+    def __len__(self):
+        return len(self.__slots__)
+    
+    def keys(self):
+        return self.__slots__
+    
+    def values(self):
+        return [getattr(self, field) for field in self.__slots__]
+    
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.__slots__]
+    
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+    
+    def copy(self):
+        return type(self)(*self.values())
+    
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.as_dict() == dict(other)
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f'{type(self).__name__}({self.as_dict()!r})'
+    
+    def __reduce__(self):
+        return _rebuild_record, (type(self).__bases__[0], self.__slots__, tuple(self.values()))
+
+
+class ProductRecord(Record):
+    """A products row, usually with its category_name."""
+    __slots__ = ()
+
+
+class CategoryRecord(Record):
+    """A categories row."""
+    __slots__ = ()
+
+
+class LogEntry(Record):
+    """An inventory log row with its product_name."""
+    __slots__ = ()
+
+
+_record_types = {}
+
+
+def _record_type(base, columns):
+    """The record class of kind base with one slot per column, created on first use."""
+    cls = _record_types.get((base, columns))
+    if cls is None:
+        # The columns become slot and parameter names in generated code, so
+        # anything but distinct, plain identifiers is refused up front
+        for column in columns:
+            if (not column.isidentifier() or keyword.iskeyword(column) or column == 'self'
+                    or hasattr(base, column) or columns.count(column) > 1):
+                raise ValueError(f"Column {column!r} can't be a {base.__name__} field")
+        
+        # Generate the __init__, as namedtuple and dataclasses do, so
+        # building a record is a plain call with positional values
+        namespace = {}
+        exec(f"def __init__(self, {', '.join(columns)}):\n"
+             + ''.join(f"    self.{column} = {column}\n" for column in columns), namespace)
+        cls = _record_types[(base, columns)] = type(
+            base.__name__, (base,), {'__slots__': columns, '__init__': namespace['__init__']})
+    return cls
+
+
+def _rebuild_record(base, columns, values):
+    return _record_type(base, columns)(*values)
+
+
+def _fetch_records(cursor, base):
+    """Fetch the rest of cursor's results as base records."""
+    cls = _record_type(base, tuple(column[0] for column in cursor.description))
+    # Plain tuples unpack faster than sqlite3.Row
+    row_factory, cursor.row_factory = cursor.row_factory, None
+    try:
+        return [cls(*row) for row in cursor.fetchall()]
+    finally:
+        cursor.row_factory = row_factory
+
+
+def _fetch_record(cursor, base):
+    """Fetch the next result of cursor as a base record, or None if there is none."""
+    records = _fetch_records(cursor, base)
+    return records[0] if records else None
+
+
+def _iter_pages(first_sql, next_sql, params, key, page_size, first_page=None,
+                record=Record):
+    """Yield result rows one page at a time using keyset pagination.
+    
+    first_sql reads the first page; next_sql takes the key of the last row
+    already yielded as extra parameters. Each page is read on its own
+    connection, so nothing is held open while the caller consumes rows.
+    A first_page already read by the caller is yielded instead of running
+    first_sql. Rows are returned as record records.
+    """
+    last_key = None
+    if first_page is not None:
+        yield from first_page
+        if len(first_page) < page_size:
+            return
+        last_key = key(first_page[-1])
+    while True:
+        with Database() as db:
+            if last_key is None:
+                db.cursor.execute(first_sql, params + (page_size,))
+            else:
+                db.cursor.execute(next_sql, params + last_key + (page_size,))
+            rows = _fetch_records(db.cursor, record)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_key = key(rows[-1])
+
+
+def _update_returning(db, sql, params, table, key_column, key):
+    """Run an UPDATE of one row and return the row as updated, or None if none matched."""
+    if HAS_RETURNING:
+        db.cursor.execute(f'{sql} RETURNING *', params)
+        return db.cursor.fetchone()
+    db.cursor.execute(sql, params)
+    if db.cursor.rowcount == 0:
+        return None
+    db.cursor.execute(f'SELECT * FROM {table} WHERE {key_column} = ?', (key,))
+    return db.cursor.fetchone()
+
+
+def _log_partitions(db, after_log_id=0):
+    """Names of the monthly log partitions still in the database, newest first.
+    
+    Only partitions holding log ids above after_log_id are listed.
+    """
+    db.cursor.execute('''
+        SELECT name FROM log_partitions
+        WHERE detached_to IS NULL AND last_log_id > ?
+        ORDER BY month DESC
+    ''', (after_log_id,))
+    return [row[0] for row in db.cursor.fetchall()]
+
+
+def log_tables(db):
+    """The live inventory_log followed by its partitions, newest entries first."""
+    return ['inventory_log'] + _log_partitions(db)
+
+
+def newest_log_id(db):
+    """The highest log id ever written, wherever that row now lives."""
+    # Not just the newest month's partition: rotate() appends late,
+    # back-dated entries to older months, so any partition may hold the top id
+    db.cursor.execute('''
+        SELECT MAX(COALESCE((SELECT MAX(log_id) FROM inventory_log), 0),
+                   COALESCE((SELECT MAX(last_log_id) FROM log_partitions), 0),
+                   COALESCE((SELECT MAX(log_id) FROM inventory_log_archive), 0))
+    ''')
+    return db.cursor.fetchone()[0]
+
+
+class CategoryCache:
+    """Read-through, in-process copy of the categories table.
+    
+    Every lookup first reads the table's generation from change_counters
+    (a primary-key lookup); if it differs from the generation the cache was
+    built from, someone - possibly another process - changed categories and
+    the table is reloaded.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._ordered = []
+        self._by_id = {}
+        self._by_name = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def invalidate(self):
+        """Force the next lookup to reload the categories table."""
+        with self._lock:
+            self._generation = None
+    
+    def _refresh(self, db):
+        db.cursor.execute("SELECT generation FROM change_counters WHERE table_name = 'categories'")
+        generation = db.cursor.fetchone()[0]
+        with self._lock:
+            if generation == self._generation:
+                self.hits += 1
+                return
+            self.misses += 1
+        
+        db.cursor.execute('SELECT * FROM categories ORDER BY name')
+        ordered = _fetch_records(db.cursor, CategoryRecord)
+        with self._lock:
+            self._ordered = ordered
+            self._by_id = {category['category_id']: category for category in ordered}
+            self._by_name = {category['name']: category for category in ordered}
+            self._generation = generation
+    
+    def all(self):
+        with Database() as db:
+            self._refresh(db)
+        return [category.copy() for category in self._ordered]
+    
+    def by_id(self, category_id, db=None):
+        """Look up a category, checking the generation on db if the caller has one open."""
+        if db is None:
+            with Database() as db:
+                self._refresh(db)
+        else:
+            self._refresh(db)
+        return _copy_or_none(self._by_id.get(category_id))
+    
+    def by_name(self, name):
+        with Database() as db:
+            self._refresh(db)
+        return _copy_or_none(self._by_name.get(name))
+    
+    def stats(self):
+        """Return hit/miss counters for the cache."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+def _copy_or_none(record):
+    # Callers get their own copy; a change to it must not reach the cache
+    return record.copy() if record is not None else None
+
+
+_category_cache = CategoryCache()
 
 
 class Category:
     @staticmethod
     def get_all():
-        with Database() as db:
-            db.cursor.execute('SELECT * FROM categories ORDER BY name')
-            return [dict(row) for row in db.cursor.fetchall()]
+        return _category_cache.all()
     
     @staticmethod
     def get_by_id(category_id):
-        with Database() as db:
-            db.cursor.execute('SELECT * FROM categories WHERE category_id = ?', (category_id,))
-            result = db.cursor.fetchone()
-            return dict(result) if result else None
+        return _category_cache.by_id(category_id)
     
     @staticmethod
+    def get_by_name(name):
+        return _category_cache.by_name(name)
+    
+    @staticmethod
+    def cache_stats():
+        return _category_cache.stats()
+    
+    @staticmethod
+    @_retry_locked
     def create(name, description=None):
-        with Database() as db:
+        with Database(write=True) as db:
             try:
                 db.cursor.execute('INSERT INTO categories (name, description) VALUES (?, ?)', 
                                (name, description))
+                _category_cache.invalidate()
                 return db.cursor.lastrowid
             except sqlite3.IntegrityError:
                 return None  # Category with this name already exists
     
     @staticmethod
     def update(category_id, name=None, description=None):
-        with Database() as db:
-            # Get current values
-            db.cursor.execute('SELECT name, description FROM categories WHERE category_id = ?', (category_id,))
-            result = db.cursor.fetchone()
-            if not result:
-                return False
-            
-            current_name, current_description = result
-            
-            # Use current values if new ones not provided
-            new_name = name if name is not None else current_name
-            new_description = description if description is not None else current_description
-            
+        return Category.update_returning(category_id, name, description) is not None
+    
+    @staticmethod
+    @_retry_locked
+    def update_returning(category_id, name=None, description=None):
+        """Update a category and return it as updated, in one statement.
+        
+        Fields left as None keep their current values. Returns None if the
+        category doesn't exist or the new name is already taken.
+        """
+        with Database(write=True) as db:
             try:
-                db.cursor.execute('UPDATE categories SET name = ?, description = ? WHERE category_id = ?', 
-                               (new_name, new_description, category_id))
-                return db.cursor.rowcount > 0
+                row = _update_returning(db, '''
+                    UPDATE categories
+                    SET name = COALESCE(?, name), description = COALESCE(?, description)
+                    WHERE category_id = ?
+                ''', (name, description, category_id), 'categories', 'category_id', category_id)
             except sqlite3.IntegrityError:
-                return False
+                return None
+            _category_cache.invalidate()
+            return _record_type(CategoryRecord, tuple(row.keys()))(*row) if row else None
     
     @staticmethod
+    @_retry_locked
     def delete(category_id):
-        with Database() as db:
+        with Database(write=True) as db:
             # Check if category has products
             db.cursor.execute('SELECT COUNT(*) FROM products WHERE category_id = ?', (category_id,))
             if db.cursor.fetchone()[0] > 0:
                 return False  # Cannot delete category with products
             
             db.cursor.execute('DELETE FROM categories WHERE category_id = ?', (category_id,))
+            _category_cache.invalidate()
             return db.cursor.rowcount > 0
 
 
+# Callbacks registered with Product.subscribe_low_stock
+_low_stock_subscribers = []
+
+# Default for update arguments where None is a value of its own (a
+# reorder_threshold of None disables alerts), meaning "leave as it is"
+UNCHANGED = object()
+
+# When set, Product.update_quantity hands its log entries to this writer
+# (see audit_log.py) instead of inserting them in its own transaction
+_log_writer = None
+
+
+def set_log_writer(writer):
+    """Route update_quantity log entries through writer; None restores direct inserts."""
+    global _log_writer
+    _log_writer = writer
+
+
+def _threshold_crossing(product_id, name, was_low, quantity, threshold):
+    """Return an alert dict if a product's low-stock state changed, else None."""
+    is_low = threshold is not None and quantity <= threshold
+    if is_low == was_low:
+        return None
+    return {'product_id': product_id, 'name': name, 'quantity': quantity,
+            'reorder_threshold': threshold, 'low': is_low}
+
+
+def _notify_low_stock(alerts):
+    for alert in alerts:
+        if alert is not None:
+            for callback in list(_low_stock_subscribers):
+                callback(alert)
+
+
+def _product_record(db, row):
+    """A products row as a record with its category_name, like Product.get_by_id."""
+    category = _category_cache.by_id(row['category_id'], db)
+    return _record_type(ProductRecord, tuple(row.keys()) + ('category_name',))(
+        *row, category['name'] if category else None)
+
+
+def _adjust_stock(db, product_id, quantity_change, action, notes, writer):
+    """Apply one stock movement on db; returns (updated products row, alert, spooled entry).
+    
+    The row is None for an unknown product or insufficient stock. The log
+    entry goes through writer if one is given (the spooled entry is then
+    returned), otherwise it is inserted directly.
+    """
+    # Apply the change in a single conditional statement so concurrent
+    # writers can't both pass the check and lose an update; the
+    # quantity is never allowed to go negative
+    row = _update_returning(db, '''
+        UPDATE products 
+        SET quantity = quantity + ?, updated_at = CURRENT_TIMESTAMP
+        WHERE product_id = ? AND quantity + ? >= 0
+    ''', (quantity_change, product_id, quantity_change), 'products', 'product_id', product_id)
+    if row is None:
+        return None, None, None
+    
+    threshold = row['reorder_threshold']
+    previous = row['quantity'] - quantity_change
+    alert = _threshold_crossing(product_id, row['name'],
+                                threshold is not None and previous <= threshold,
+                                row['quantity'], threshold)
+    
+    # Log the inventory change
+    if writer is not None:
+        return row, alert, writer.spool(db, product_id, action, quantity_change, notes)
+    db.cursor.execute('''
+        INSERT INTO inventory_log (product_id, action, quantity, notes) 
+        VALUES (?, ?, ?, ?)
+    ''', (product_id, action, quantity_change, notes))
+    return row, alert, None
+
+
+def _move_stock(product_id, quantity_change, action, notes, record=False):
+    """Apply one stock movement in its own transaction; returns (row, alert).
+    
+    A log writer's entry is spooled before the commit and queued after it,
+    so a crash in between can't lose it (see audit_log.py). With record=True
+    the row comes back as a product record.
+    """
+    writer = _log_writer
+    entry = None
+    try:
+        with Database(write=True) as db:
+            row, alert, entry = _adjust_stock(db, product_id, quantity_change, action, notes, writer)
+            if row is not None and record:
+                row = _product_record(db, row)
+    except BaseException:
+        if entry is not None:
+            writer.cancel(entry)
+        raise
+    
+    if entry is not None:
+        writer.queue(entry)
+    return row, alert
+
+
 class Product:
     @staticmethod
     def get_all():
@@ -84,7 +760,23 @@ class Product:
                 LEFT JOIN categories c ON p.category_id = c.category_id
                 ORDER BY p.name
             ''')
-            return [dict(row) for row in db.cursor.fetchall()]
+            return _fetch_records(db.cursor, ProductRecord)
+    
+    @staticmethod
+    def iter_all(page_size=500):
+        """Yield all products ordered by name, reading page_size rows at a time."""
+        query = '''
+            SELECT p.*, c.name as category_name 
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.category_id
+            {where}
+            ORDER BY p.name, p.product_id
+            LIMIT ?
+        '''
+        return _iter_pages(query.format(where=''),
+                           query.format(where='WHERE (p.name, p.product_id) > (?, ?)'),
+                           (), lambda row: (row['name'], row['product_id']), page_size,
+                           record=ProductRecord)
     
     @staticmethod
     def get_by_id(product_id):
@@ -95,12 +787,35 @@ class Product:
                 LEFT JOIN categories c ON p.category_id = c.category_id
                 WHERE p.product_id = ?
             ''', (product_id,))
-            result = db.cursor.fetchone()
-            return dict(result) if result else None
+            return _fetch_record(db.cursor, ProductRecord)
     
     @staticmethod
-    def search(keyword):
+    def search(keyword, limit=None):
+        """Search products by name or description.
+        
+        Uses the products_fts full-text index when available: every word in
+        keyword is matched as a prefix and results are ranked by bm25. Falls
+        back to a LIKE scan ordered by name if SQLite lacks FTS5 or keyword
+        has no searchable words.
+        """
+        terms = re.findall(r'\w+', keyword)
         with Database() as db:
+            if terms:
+                match = ' '.join(f'"{term}"*' for term in terms)
+                try:
+                    db.cursor.execute('''
+                        SELECT p.*, c.name as category_name 
+                        FROM products_fts f
+                        JOIN products p ON p.product_id = f.rowid
+                        LEFT JOIN categories c ON p.category_id = c.category_id
+                        WHERE products_fts MATCH ?
+                        ORDER BY f.rank
+                        LIMIT ?
+                    ''', (match, -1 if limit is None else limit))
+                    return _fetch_records(db.cursor, ProductRecord)
+                except sqlite3.OperationalError:
+                    pass  # No FTS5 support or index; use the LIKE scan below
+            
             search_term = f"%{keyword}%"
             db.cursor.execute('''
                 SELECT p.*, c.name as category_name 
@@ -108,12 +823,14 @@ class Product:
                 LEFT JOIN categories c ON p.category_id = c.category_id
                 WHERE p.name LIKE ? OR p.description LIKE ?
                 ORDER BY p.name
-            ''', (search_term, search_term))
-            return [dict(row) for row in db.cursor.fetchall()]
+                LIMIT ?
+            ''', (search_term, search_term, -1 if limit is None else limit))
+            return _fetch_records(db.cursor, ProductRecord)
     
     @staticmethod
+    @_retry_locked
     def create(name, description, price, quantity, category_id):
-        with Database() as db:
+        with Database(write=True) as db:
             try:
                 db.cursor.execute('''
                     INSERT INTO products (name, description, price, quantity, category_id) 
@@ -129,74 +846,245 @@ class Product:
                 ''', (product_id, 'CREATE', quantity, 'Product created'))
                 
                 return product_id
-            except sqlite3.Error:
-                return None
+            except sqlite3.IntegrityError:
+                return None  # A required field is missing
     
     @staticmethod
     def update(product_id, name=None, description=None, price=None, category_id=None):
-        with Database() as db:
-            # Get current values
-            db.cursor.execute('''
-                SELECT name, description, price, category_id 
-                FROM products WHERE product_id = ?
-            ''', (product_id,))
-            result = db.cursor.fetchone()
-            if not result:
-                return False
-            
-            current_name, current_description, current_price, current_category_id = result
-            
-            # Use current values if new ones not provided
-            new_name = name if name is not None else current_name
-            new_description = description if description is not None else current_description
-            new_price = price if price is not None else current_price
-            new_category_id = category_id if category_id is not None else current_category_id
-            
+        return Product.update_returning(product_id, name, description, price,
+                                        category_id) is not None
+    
+    @staticmethod
+    @_retry_locked
+    def update_returning(product_id, name=None, description=None, price=None, category_id=None,
+                         reorder_threshold=UNCHANGED):
+        """Update a product and return it as updated (with category_name), in one statement.
+        
+        Fields left as None keep their current values. A reorder_threshold
+        is set in the same transaction, as by set_reorder_threshold (None
+        disables alerts). Returns None if the product doesn't exist or the
+        change violates a constraint.
+        """
+        set_threshold = reorder_threshold is not UNCHANGED
+        with Database(write=True) as db:
+            previous = None
+            if set_threshold:
+                db.cursor.execute('SELECT reorder_threshold FROM products WHERE product_id = ?',
+                                  (product_id,))
+                result = db.cursor.fetchone()
+                previous = result[0] if result else None
             try:
-                db.cursor.execute('''
+                row = _update_returning(db, '''
                     UPDATE products 
-                    SET name = ?, description = ?, price = ?, category_id = ?, updated_at = CURRENT_TIMESTAMP
+                    SET name = COALESCE(?, name), description = COALESCE(?, description),
+                        price = COALESCE(?, price), category_id = COALESCE(?, category_id),
+                        reorder_threshold = CASE WHEN ? THEN ? ELSE reorder_threshold END,
+                        updated_at = CURRENT_TIMESTAMP
                     WHERE product_id = ?
-                ''', (new_name, new_description, new_price, new_category_id, product_id))
-                
-                return db.cursor.rowcount > 0
-            except sqlite3.Error:
-                return False
+                ''', (name, description, price, category_id,
+                      set_threshold, reorder_threshold if set_threshold else None, product_id),
+                   'products', 'product_id', product_id)
+            except sqlite3.IntegrityError:
+                return None
+            product = _product_record(db, row) if row else None
+        
+        if product is not None and set_threshold:
+            quantity = product['quantity']
+            _notify_low_stock([_threshold_crossing(product_id, product['name'],
+                                                   previous is not None and quantity <= previous,
+                                                   quantity, reorder_threshold)])
+        return product
     
     @staticmethod
+    @_retry_locked
     def update_quantity(product_id, quantity_change, action, notes=None):
-        with Database() as db:
-            # Get current quantity
-            db.cursor.execute('SELECT quantity FROM products WHERE product_id = ?', (product_id,))
-            result = db.cursor.fetchone()
-            if not result:
-                return False
-            
-            current_quantity = result[0]
-            new_quantity = current_quantity + quantity_change
+        row, alert = _move_stock(product_id, quantity_change, action, notes)
+        if row is None:
+            return False  # Unknown product or insufficient stock
+        
+        _notify_low_stock([alert])
+        return True
+    
+    @staticmethod
+    @_retry_locked
+    def update_quantity_returning(product_id, quantity_change, action, notes=None):
+        """Apply a stock movement and return the product as updated (with category_name).
+        
+        Behaves like update_quantity but returns None where that returns
+        False, so callers showing the new stock level need no second read.
+        """
+        product, alert = _move_stock(product_id, quantity_change, action, notes, record=True)
+        if product is None:
+            return None
+        
+        _notify_low_stock([alert])
+        return product
+    
+    @staticmethod
+    def apply_movements(movements):
+        """Apply many stock movements in a single transaction.
+        
+        movements is an iterable of (product_id, quantity_change, action, notes)
+        tuples, applied in order. A movement for an unknown product, or one
+        that would take stock below zero, is rejected on its own without
+        affecting the rest of the batch.
+        
+        Returns one result dict per movement with the keys 'product_id',
+        'ok', 'quantity' (stock after the movement) and 'error'.
+        """
+        return Product._apply_movements(list(movements))
+    
+    @staticmethod
+    @_retry_locked
+    def _apply_movements(movements):
+        product_ids = list({movement[0] for movement in movements})
+        
+        # Take the write lock up front so the stock levels read below
+        # can't change before the batch is written back
+        with Database(write=True) as db:
+            stock = {}
+            thresholds = {}
+            names = {}
+            for start in range(0, len(product_ids), MAX_SQL_PARAMS):
+                chunk = product_ids[start:start + MAX_SQL_PARAMS]
+                placeholders = ', '.join('?' * len(chunk))
+                db.cursor.execute(f'SELECT product_id, quantity, reorder_threshold, name '
+                                  f'FROM products WHERE product_id IN ({placeholders})', chunk)
+                for product_id, quantity, threshold, name in db.cursor.fetchall():
+                    stock[product_id] = quantity
+                    thresholds[product_id] = threshold
+                    names[product_id] = name
+            initial = dict(stock)
             
-            # Ensure quantity doesn't go negative
-            if new_quantity < 0:
-                return False
+            results = []
+            log_rows = []
+            for product_id, quantity_change, action, notes in movements:
+                if product_id not in stock:
+                    results.append({'product_id': product_id, 'ok': False,
+                                    'quantity': None, 'error': 'unknown product'})
+                    continue
+                
+                new_quantity = stock[product_id] + quantity_change
+                if new_quantity < 0:
+                    results.append({'product_id': product_id, 'ok': False,
+                                    'quantity': stock[product_id], 'error': 'insufficient stock'})
+                    continue
+                
+                stock[product_id] = new_quantity
+                log_rows.append((product_id, action, quantity_change, notes))
+                results.append({'product_id': product_id, 'ok': True,
+                                'quantity': new_quantity, 'error': None})
             
-            # Update product quantity
-            db.cursor.execute('''
+            touched = {row[0] for row in log_rows}
+            db.cursor.executemany('''
                 UPDATE products 
                 SET quantity = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE product_id = ?
-            ''', (new_quantity, product_id))
+            ''', [(stock[product_id], product_id) for product_id in touched])
             
-            # Log the inventory change
-            db.cursor.execute('''
+            db.cursor.executemany('''
                 INSERT INTO inventory_log (product_id, action, quantity, notes) 
                 VALUES (?, ?, ?, ?)
-            ''', (product_id, action, quantity_change, notes))
+            ''', log_rows)
+        
+        # One alert per product whose state differs at the end of the batch
+        if _low_stock_subscribers:
+            _notify_low_stock(
+                _threshold_crossing(product_id, names[product_id],
+                                    thresholds[product_id] is not None
+                                    and initial[product_id] <= thresholds[product_id],
+                                    stock[product_id], thresholds[product_id])
+                for product_id in touched)
+        return results
+    
+    @staticmethod
+    @_retry_locked
+    def set_reorder_threshold(product_id, threshold):
+        """Set the stock level at or below which a product is low; None disables alerts."""
+        with Database(write=True) as db:
+            db.cursor.execute('SELECT quantity, reorder_threshold, name FROM products '
+                              'WHERE product_id = ?', (product_id,))
+            result = db.cursor.fetchone()
+            if not result:
+                return False
+            quantity, previous, name = result
             
-            return True
+            db.cursor.execute('''
+                UPDATE products 
+                SET reorder_threshold = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE product_id = ?
+            ''', (threshold, product_id))
+        
+        _notify_low_stock([_threshold_crossing(product_id, name,
+                                               previous is not None and quantity <= previous,
+                                               quantity, threshold)])
+        return True
     
     @staticmethod
-    def delete(product_id):
+    def low_stock():
+        """Return products at or below their reorder threshold, lowest stock first.
+        
+        Reads only the idx_products_low_stock partial index, so the cost
+        follows the number of alerts rather than the size of the catalog.
+        """
+        with Database() as db:
+            db.cursor.execute('''
+                SELECT p.*, c.name as category_name 
+                FROM products p
+                LEFT JOIN categories c ON p.category_id = c.category_id
+                WHERE p.quantity <= p.reorder_threshold
+                ORDER BY p.quantity
+            ''')
+            return _fetch_records(db.cursor, ProductRecord)
+    
+    @staticmethod
+    def subscribe_low_stock(callback):
+        """Call callback(alert) whenever a product crosses its reorder threshold.
+        
+        alert is a dict with 'product_id', 'name', 'quantity',
+        'reorder_threshold' and 'low' (True when stock fell to or below the
+        threshold, False when it recovered). Callbacks run on the writing thread after the change has
+        been committed; a batch of movements reports each product's net
+        change once. Returns callback, so this can be used as a decorator.
+        """
+        _low_stock_subscribers.append(callback)
+        return callback
+    
+    @staticmethod
+    def unsubscribe_low_stock(callback):
+        _low_stock_subscribers.remove(callback)
+    
+    @staticmethod
+    def stock_as_of(product_id, timestamp):
+        """Return a product's quantity at a past datetime or SQLite timestamp string.
+        
+        Starts from the newest snapshot at or before timestamp and adds the
+        log entries (live or archived) recorded after it.
+        """
+        timestamp = sql_timestamp(timestamp)
         with Database() as db:
+            db.cursor.execute('''
+                SELECT quantity, last_log_id, taken_at FROM stock_snapshots
+                WHERE product_id = ? AND taken_at <= ?
+                ORDER BY taken_at DESC LIMIT 1
+            ''', (product_id, timestamp))
+            result = db.cursor.fetchone()
+            quantity, last_log_id, since = tuple(result) if result else (0, 0, '')
+            
+            tail = '''
+                SELECT COALESCE(SUM(quantity), 0) FROM {table}
+                WHERE product_id = ? AND timestamp >= ? AND timestamp <= ? AND log_id > ?
+            '''
+            for table in log_tables(db) + ['inventory_log_archive']:
+                db.cursor.execute(tail.format(table=table),
+                                  (product_id, since, timestamp, last_log_id))
+                quantity += db.cursor.fetchone()[0]
+            return quantity
+    
+    @staticmethod
+    @_retry_locked
+    def delete(product_id):
+        with Database(write=True) as db:
             # Get current quantity for logging
             db.cursor.execute('SELECT quantity FROM products WHERE product_id = ?', (product_id,))
             result = db.cursor.fetchone()
@@ -216,27 +1104,299 @@ class Product:
             return db.cursor.rowcount > 0
 
 
-class InventoryLog:
+def sql_timestamp(value):
+    """Format a datetime the way SQLite's CURRENT_TIMESTAMP stores it."""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+class StockSnapshot:
+    """Checkpoints of per-product stock, so history queries replay only a log tail.
+    
+    A snapshot row records a product's quantity after every inventory_log
+    entry up to last_log_id. Products with no log entries since the previous
+    checkpoint are skipped; their earlier snapshot is still current.
+    """
+    
     @staticmethod
-    def get_all(limit=100):
+    @_retry_locked
+    def take():
+        """Checkpoint every product changed since the last snapshot; returns the row count."""
+        # Buffered log entries must be in the table before quantities are
+        # recorded against a log id
+        if _log_writer is not None:
+            _log_writer.flush()
+        # Block writers so quantities and last_log_id agree
+        with Database(write=True) as db:
+            last_log_id = newest_log_id(db)
+            
+            db.cursor.execute('SELECT last_log_id FROM stock_snapshots ORDER BY taken_at DESC LIMIT 1')
+            result = db.cursor.fetchone()
+            previous_log_id = result[0] if result else 0
+            
+            # New entries may already have been rotated into a partition
+            tables = ['inventory_log'] + _log_partitions(db, previous_log_id)
+            changed = ' UNION ALL '.join(f'SELECT product_id FROM {table} WHERE log_id > ?'
+                                         for table in tables)
+            db.cursor.execute(f'''
+                INSERT OR REPLACE INTO stock_snapshots (product_id, taken_at, quantity, last_log_id)
+                SELECT product_id, CURRENT_TIMESTAMP, quantity, ?
+                FROM products
+                WHERE product_id IN ({changed})
+            ''', (last_log_id,) + (previous_log_id,) * len(tables))
+            return db.cursor.rowcount
+    
+    @staticmethod
+    def take_if_due(max_age_hours=24):
+        """Take a snapshot if the newest one is older than max_age_hours."""
         with Database() as db:
             db.cursor.execute('''
-                SELECT l.*, p.name as product_name
-                FROM inventory_log l
-                JOIN products p ON l.product_id = p.product_id
-                ORDER BY l.timestamp DESC
-                LIMIT ?
-            ''', (limit,))
+                SELECT COUNT(*) FROM stock_snapshots WHERE taken_at > datetime('now', ?)
+            ''', (f'-{max_age_hours} hours',))
+            if db.cursor.fetchone()[0] > 0:
+                return 0
+        return StockSnapshot.take()
+    
+    @staticmethod
+    @_retry_locked
+    def compact_log(before):
+        """Archive log rows already folded into a snapshot taken at or before `before`.
+        
+        Rows move to inventory_log_archive, which Product.stock_as_of still
+        reads, so history queries give the same answers afterwards. Returns
+        the number of rows moved.
+        """
+        with Database(write=True) as db:
+            db.cursor.execute('''
+                SELECT last_log_id FROM stock_snapshots
+                WHERE taken_at <= ?
+                ORDER BY taken_at DESC LIMIT 1
+            ''', (sql_timestamp(before),))
+            result = db.cursor.fetchone()
+            if not result:
+                return 0  # Nothing has been checkpointed yet
+            
+            moved = 0
+            for table in log_tables(db):
+                db.cursor.execute(f'''
+                    INSERT OR IGNORE INTO inventory_log_archive
+                    SELECT log_id, product_id, action, quantity, timestamp, notes
+                    FROM {table} WHERE log_id <= ?
+                ''', tuple(result))
+                db.cursor.execute(f'DELETE FROM {table} WHERE log_id <= ?', tuple(result))
+                moved += db.cursor.rowcount
+            return moved
+
+
+class LogPartition:
+    """Monthly partitions of the inventory log.
+    
+    Every write goes to inventory_log, which stays small: rotate() moves
+    each finished month out into its own inventory_log_YYYY_MM table, and
+    detach() exports a sealed month to a separate database file for
+    archival, without touching inventory_log at all. InventoryLog and the
+    history queries read the live table and the partitions together.
+    """
+    
+    @staticmethod
+    def _next_month(month):
+        year, number = map(int, month.split('-'))
+        return f'{year + number // 12:04d}-{number % 12 + 1:02d}-01 00:00:00'
+    
+    @staticmethod
+    @_retry_locked
+    def rotate(before=None):
+        """Move log rows from months before `before` into partitions; returns the row count.
+        
+        before defaults to now, so every month except the current (UTC) one
+        is moved out of inventory_log.
+        """
+        cutoff = sql_timestamp(before or datetime.now(timezone.utc))[:7] + '-01 00:00:00'
+        moved = 0
+        with Database(write=True) as db:
+            while True:
+                db.cursor.execute('SELECT MIN(timestamp) FROM inventory_log WHERE timestamp < ?',
+                                  (cutoff,))
+                oldest = db.cursor.fetchone()[0]
+                if oldest is None:
+                    return moved
+                month = str(oldest)[:7]
+                if not re.fullmatch(r'\d{4}-\d{2}', month):
+                    raise ValueError(f"Cannot partition log timestamp {oldest!r}")
+                
+                db.cursor.execute('SELECT detached_to FROM log_partitions WHERE month = ?', (month,))
+                result = db.cursor.fetchone()
+                if result and result[0]:
+                    raise ValueError(f"Log partition {month} was detached to {result[0]}")
+                
+                name = f"inventory_log_{month.replace('-', '_')}"
+                for statement in log_partition(name):
+                    db.cursor.execute(statement)
+                bounds = (oldest, LogPartition._next_month(month))
+                db.cursor.execute(f'''
+                    INSERT INTO {name}
+                    SELECT log_id, product_id, action, quantity, timestamp, notes
+                    FROM inventory_log WHERE timestamp >= ? AND timestamp < ?
+                ''', bounds)
+                moved += db.cursor.rowcount
+                db.cursor.execute('DELETE FROM inventory_log WHERE timestamp >= ? AND timestamp < ?',
+                                  bounds)
+                db.cursor.execute(f'''
+                    INSERT OR REPLACE INTO log_partitions (month, name, first_log_id, last_log_id)
+                    SELECT ?, ?, MIN(log_id), MAX(log_id) FROM {name}
+                ''', (month, name))
+    
+    @staticmethod
+    def list():
+        """Return every partition, attached or detached, newest first."""
+        with Database() as db:
+            db.cursor.execute('SELECT * FROM log_partitions ORDER BY month DESC')
             return [dict(row) for row in db.cursor.fetchall()]
     
+    @staticmethod
+    @_retry_locked
+    def detach(month, path):
+        """Export the partition for month ('YYYY-MM') to path and drop it here.
+        
+        The rows land in an inventory_log table in the file at path, which
+        is created if needed. Entries in a detached month no longer show up
+        in the log, reports or Product.stock_as_of. Returns the number of
+        rows exported, or None if there is no such partition.
+        """
+        with Database() as db:
+            db.cursor.execute('SELECT name FROM log_partitions '
+                              'WHERE month = ? AND detached_to IS NULL', (month,))
+            result = db.cursor.fetchone()
+            if not result:
+                return None
+            name = result[0]
+            
+            db.conn.execute('ATTACH DATABASE ? AS archive', (path,))
+            try:
+                # Copy first and commit, so a crash can only leave the rows in
+                # both places; running detach again then finishes the job
+                for statement in log_partition('inventory_log', schema='archive'):
+                    db.cursor.execute(statement)
+                db.cursor.execute(f'INSERT OR IGNORE INTO archive.inventory_log SELECT * FROM {name}')
+                db.conn.commit()
+                
+                db.cursor.execute(f'SELECT COUNT(*) FROM {name}')
+                exported = db.cursor.fetchone()[0]
+                db.conn.execute('BEGIN IMMEDIATE')
+                db.cursor.execute(f'DROP TABLE {name}')
+                db.cursor.execute('UPDATE log_partitions SET detached_to = ? WHERE month = ?',
+                                  (os.path.abspath(path), month))
+                # Rows left the log without a DELETE, so bump its generation by hand
+                db.cursor.execute("UPDATE change_counters SET generation = generation + 1 "
+                                  "WHERE table_name = 'inventory_log'")
+                db.conn.commit()
+            finally:
+                if db.conn.in_transaction:
+                    db.conn.rollback()
+                db.conn.execute('DETACH DATABASE archive')
+            return exported
+
+
+class InventoryLog:
+    """Reads over the live log and its monthly partitions.
+    
+    Each partition only holds entries older than those in the tables before
+    it in log_tables, so reading the tables in that order and concatenating
+    gives the whole log newest first.
+    """
+    
+    QUERY = '''
+        SELECT l.*, p.name as product_name
+        FROM {table} l
+        JOIN products p ON l.product_id = p.product_id
+    '''
+    
+    @staticmethod
+    def get_all(limit=100):
+        entries = []
+        with Database() as db:
+            for table in log_tables(db):
+                db.cursor.execute(InventoryLog.QUERY.format(table=table) + '''
+                    ORDER BY l.timestamp DESC
+                    LIMIT ?
+                ''', (limit - len(entries),))
+                entries.extend(_fetch_records(db.cursor, LogEntry))
+                if len(entries) >= limit:
+                    break
+        return entries
+    
+    @staticmethod
+    def iter_all(page_size=500):
+        """Yield the whole log newest first, reading page_size rows at a time."""
+        query = InventoryLog.QUERY + '''
+            {where}
+            ORDER BY l.timestamp DESC, l.log_id DESC
+            LIMIT ?
+        '''
+        with Database() as db:
+            tables = log_tables(db)
+        return chain.from_iterable(
+            _iter_pages(query.format(table=table, where=''),
+                        query.format(table=table, where='WHERE (l.timestamp, l.log_id) < (?, ?)'),
+                        (), lambda row: (row['timestamp'], row['log_id']), page_size,
+                        record=LogEntry)
+            for table in tables)
+    
     @staticmethod
     def get_by_product(product_id):
+        entries = []
+        with Database() as db:
+            for table in log_tables(db):
+                db.cursor.execute(InventoryLog.QUERY.format(table=table) + '''
+                    WHERE l.product_id = ?
+                    ORDER BY l.timestamp DESC
+                ''', (product_id,))
+                entries.extend(_fetch_records(db.cursor, LogEntry))
+        return entries
+    
+    PRODUCT_PAGE = QUERY + '''
+        WHERE l.product_id = ? {where}
+        ORDER BY l.timestamp DESC, l.log_id DESC
+        LIMIT ?
+    '''
+    
+    @staticmethod
+    def iter_by_product(product_id, page_size=500):
+        """Yield a product's log newest first, reading page_size rows at a time."""
+        with Database() as db:
+            tables = log_tables(db)
+        return InventoryLog._product_pages(tables, product_id, page_size)
+    
+    @staticmethod
+    def product_history(product_id, page_size=500):
+        """Return (product, its log newest first) for a product, or (None, []) if unknown.
+        
+        The product and the first page of its log are read on one
+        connection; further pages are read as the caller consumes the log.
+        """
         with Database() as db:
             db.cursor.execute('''
-                SELECT l.*, p.name as product_name
-                FROM inventory_log l
-                JOIN products p ON l.product_id = p.product_id
-                WHERE l.product_id = ?
-                ORDER BY l.timestamp DESC
+                SELECT p.*, c.name as category_name 
+                FROM products p
+                LEFT JOIN categories c ON p.category_id = c.category_id
+                WHERE p.product_id = ?
             ''', (product_id,))
-            return [dict(row) for row in db.cursor.fetchall()]
+            product = _fetch_record(db.cursor, ProductRecord)
+            if product is None:
+                return None, []
+            tables = log_tables(db)
+            db.cursor.execute(InventoryLog.PRODUCT_PAGE.format(table=tables[0], where=''),
+                              (product_id, page_size))
+            first_page = _fetch_records(db.cursor, LogEntry)
+        return product, InventoryLog._product_pages(tables, product_id, page_size, first_page)
+    
+    @staticmethod
+    def _product_pages(tables, product_id, page_size, first_page=None):
+        query = InventoryLog.PRODUCT_PAGE
+        return chain.from_iterable(
+            _iter_pages(query.format(table=table, where=''),
+                        query.format(table=table, where='AND (l.timestamp, l.log_id) < (?, ?)'),
+                        (product_id,), lambda row: (row['timestamp'], row['log_id']), page_size,
+                        first_page if i == 0 else None, LogEntry)
+            for i, table in enumerate(tables))
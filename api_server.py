@@ -0,0 +1,500 @@
+"""
+HTTP JSON API over the Category, Product and InventoryLog models.
+
+Requests are handled on a fixed pool of worker threads, each using pooled
+database connections, so reads run concurrently (the database is in WAL
+mode). Writes are serialized: category/product changes take a single
+write lock, and stock movements are funnelled through one writer thread
+that commits whatever has queued up as a single apply_movements batch.
+
+Endpoints:
+    GET    /categories                     GET    /categories/<id>
+    POST   /categories                     PATCH  /categories/<id>
+    DELETE /categories/<id>
+    GET    /products[?q=keyword&limit=n]   GET    /products/<id>
+    POST   /products                       PATCH  /products/<id>
+    DELETE /products/<id>
+    POST   /products/<id>/movements        {"quantity_change", "action", "notes"}
+    POST   /movements                      [{"product_id", "quantity_change", ...}, ...]
+    GET    /products/<id>/log              GET    /products/<id>/stock?as_of=<timestamp>
+    GET    /log[?limit=n]                  GET    /products/low-stock
+    GET    /reports/valuation              GET    /reports/movements[?period=day|week|month&start=&end=]
+    GET    /reports/top-movers[?limit=n&start=&end=&action=]
+    GET    /metrics                        (Prometheus text format, with --instrument)
+
+Usage: python api_server.py [--host 127.0.0.1] [--port 8000] [--workers 8] [--instrument]
+                            [--busy-timeout MS]
+
+Writes that still find the database locked by another process after
+their retries are answered with 503.
+"""
+
+import argparse
+import json
+import queue
+import re
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import instrumentation
+from db_schema import initialize_database
+from models import (Category, DatabaseLockedError, InventoryLog, Product, Record, get_pool,
+                    set_lock_policy)
+from reports import Report
+
+# Serializes every write that doesn't go through the movement batcher
+_write_lock = threading.Lock()
+
+
+class MovementBatcher:
+    """Applies stock movements from many requests on one writer thread.
+    
+    Each wake-up drains whatever is queued (up to max_batch movements,
+    waiting at most max_wait seconds for more) and commits it with a single
+    Product.apply_movements call.
+    """
+    
+    def __init__(self, max_batch=1000, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='movement-writer', daemon=True)
+        self._thread.start()
+    
+    def submit(self, movements):
+        """Queue (product_id, quantity_change, action, notes) tuples; wait for their results."""
+        future = Future()
+        self._queue.put((list(movements), future))
+        return future.result()
+    
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            count = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                count += len(item[0])
+            self._apply(batch)
+    
+    @staticmethod
+    def _apply(batch):
+        movements = [movement for requested, _ in batch for movement in requested]
+        try:
+            with _write_lock:
+                results = Product.apply_movements(movements)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        start = 0
+        for requested, future in batch:
+            future.set_result(results[start:start + len(requested)])
+            start += len(requested)
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _integer(value):
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(value)
+    return int(value)
+
+
+def _string(value):
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return value
+
+
+def _field(body, key, convert, expected):
+    """body[key] converted with convert, None if absent or null; 400 if it doesn't convert."""
+    value = body.get(key)
+    if value is None:
+        return None
+    try:
+        if isinstance(value, bool):
+            raise TypeError(value)
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{key} must be {expected}")
+
+
+def _object(body):
+    if not isinstance(body, dict):
+        raise ApiError(400, "request body must be a JSON object")
+    return body
+
+
+def _movement(body, product_id=None):
+    """A validated (product_id, quantity_change, action, notes) movement from a request body.
+    
+    Movements from concurrent requests are applied in one batch, so a bad
+    one must be refused here rather than fail everyone else's.
+    """
+    _object(body)
+    if product_id is None:
+        product_id = _field(body, 'product_id', _integer, "an integer")
+    quantity_change = _field(body, 'quantity_change', _integer, "an integer")
+    if product_id is None or quantity_change is None:
+        raise ApiError(400, "movement needs integer product_id and quantity_change")
+    return (int(product_id), quantity_change,
+            _field(body, 'action', _string, "a string") or 'ADJUST',
+            _field(body, 'notes', _string, "a string or null"))
+
+
+def _name_field(body):
+    name = _field(body, 'name', _string, "a string")
+    if name is not None and not name.strip():
+        raise ApiError(400, "name must not be empty")
+    return name
+
+
+def _category_fields(body):
+    """Validated (name, description) from a request body; absent fields come back as None."""
+    _object(body)
+    return _name_field(body), _field(body, 'description', _string, "a string")
+
+
+def _product_fields(body):
+    """Validated (name, description, price, quantity, category_id) from a request body.
+    
+    Fields the body leaves out (or sets to null) come back as None.
+    """
+    _object(body)
+    return (_name_field(body), _field(body, 'description', _string, "a string"),
+            _field(body, 'price', float, "a number"),
+            _field(body, 'quantity', _integer, "an integer"),
+            _field(body, 'category_id', _integer, "an integer"))
+
+
+def _found(record, what):
+    if record is None:
+        raise ApiError(404, f"{what} not found")
+    return record
+
+
+class PlainText(str):
+    """A response body sent as-is rather than as JSON."""
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class InventoryRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True  # don't hold small responses back for delayed ACKs
+    batcher = None
+    
+    routes = []  # (method, compiled pattern, handler name), filled in below
+    
+    def log_message(self, format, *args):
+        pass  # Keep request logging out of the hot path
+    
+    def _send(self, status, payload):
+        if isinstance(payload, PlainText):
+            body, content_type = payload.encode('utf-8'), PlainText.content_type
+        else:
+            body = json.dumps(payload, default=Record.as_dict).encode('utf-8')
+            content_type = 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "request body is not valid JSON")
+    
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            for route_method, pattern, handler in self.routes:
+                match = pattern.fullmatch(url.path)
+                if match and route_method == method:
+                    status, payload = getattr(self, handler)(*match.groups())
+                    break
+            else:
+                raise ApiError(404, "no such endpoint")
+        except ApiError as e:
+            status, payload = e.status, {'error': str(e)}
+        except DatabaseLockedError as e:
+            status, payload = 503, {'error': str(e)}
+        except ValueError as e:
+            status, payload = 400, {'error': str(e)}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+        self._send(status, payload)
+    
+    def do_GET(self):
+        self._dispatch('GET')
+    
+    def do_POST(self):
+        self._dispatch('POST')
+    
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+    
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+    
+    # Categories
+    
+    def list_categories(self):
+        return 200, Category.get_all()
+    
+    def get_category(self, category_id):
+        return 200, _found(Category.get_by_id(int(category_id)), "category")
+    
+    def create_category(self):
+        name, description = _category_fields(self._body())
+        if name is None:
+            raise ApiError(400, "name is required")
+        with _write_lock:
+            category_id = Category.create(name, description)
+        if category_id is None:
+            raise ApiError(409, "a category with this name already exists")
+        return 201, Category.get_by_id(category_id)
+    
+    def update_category(self, category_id):
+        name, description = _category_fields(self._body())
+        with _write_lock:
+            category = Category.update_returning(int(category_id), name, description)
+        if category is None:
+            raise ApiError(409, "category not found or name already exists")
+        return 200, category
+    
+    def delete_category(self, category_id):
+        with _write_lock:
+            success = Category.delete(int(category_id))
+        if not success:
+            raise ApiError(409, "category not found or still has products")
+        return 200, {'deleted': int(category_id)}
+    
+    # Products
+    
+    def list_products(self):
+        limit = int(self.query['limit']) if 'limit' in self.query else None
+        if self.query.get('q'):
+            return 200, Product.search(self.query['q'], limit)
+        products = Product.iter_all()
+        if limit is not None:
+            products = (product for _, product in zip(range(limit), products))
+        return 200, list(products)
+    
+    def low_stock(self):
+        return 200, Product.low_stock()
+    
+    def get_product(self, product_id):
+        return 200, _found(Product.get_by_id(int(product_id)), "product")
+    
+    def create_product(self):
+        name, description, price, quantity, category_id = _product_fields(self._body())
+        if name is None or price is None:
+            raise ApiError(400, "name and a numeric price are required")
+        with _write_lock:
+            product_id = Product.create(name, description, price, quantity or 0, category_id)
+        if product_id is None:
+            raise ApiError(409, "product could not be created")
+        return 201, Product.get_by_id(product_id)
+    
+    def update_product(self, product_id):
+        body = self._body()
+        name, description, price, _, category_id = _product_fields(body)
+        changes = {}
+        if 'reorder_threshold' in body:
+            changes['reorder_threshold'] = _field(body, 'reorder_threshold', _integer,
+                                                  "an integer or null")
+        # The threshold and the other fields are applied in one transaction
+        with _write_lock:
+            product = Product.update_returning(int(product_id), name, description, price,
+                                               category_id, **changes)
+        if product is None:
+            raise ApiError(404, "product not found")
+        return 200, product
+    
+    def delete_product(self, product_id):
+        with _write_lock:
+            success = Product.delete(int(product_id))
+        if not success:
+            raise ApiError(404, "product not found")
+        return 200, {'deleted': int(product_id)}
+    
+    def product_stock(self, product_id):
+        if 'as_of' in self.query:
+            quantity = Product.stock_as_of(int(product_id), self.query['as_of'])
+        else:
+            quantity = _found(Product.get_by_id(int(product_id)), "product")['quantity']
+        return 200, {'product_id': int(product_id), 'quantity': quantity}
+    
+    # Stock movements and the log
+    
+    def move_stock(self, product_id):
+        result, = self.batcher.submit([_movement(self._body(), product_id)])
+        if not result['ok']:
+            raise ApiError(404 if result['error'] == 'unknown product' else 409, result['error'])
+        return 200, result
+    
+    def move_stock_batch(self):
+        body = self._body()
+        if not isinstance(body, list):
+            raise ApiError(400, "expected a JSON list of movements")
+        return 200, self.batcher.submit([_movement(item) for item in body])
+    
+    def list_log(self):
+        return 200, InventoryLog.get_all(int(self.query.get('limit', 100)))
+    
+    def product_log(self, product_id):
+        return 200, InventoryLog.get_by_product(int(product_id))
+    
+    # Reports
+    
+    def report_valuation(self):
+        return 200, Report.valuation_by_category()
+    
+    def report_movements(self):
+        return 200, Report.movements_by_period(self.query.get('period', 'day'),
+                                               self.query.get('start'), self.query.get('end'))
+    
+    def report_top_movers(self):
+        return 200, Report.top_movers(int(self.query.get('limit', 10)), self.query.get('start'),
+                                      self.query.get('end'), self.query.get('action'))
+    
+    # Monitoring
+    
+    def metrics(self):
+        if not instrumentation.is_enabled():
+            raise ApiError(404, "instrumentation is off; start the server with --instrument")
+        return 200, PlainText(instrumentation.prometheus_text())
+
+
+InventoryRequestHandler.routes = [
+    (method, re.compile(pattern), handler) for method, pattern, handler in [
+        ('GET', r'/categories', 'list_categories'),
+        ('POST', r'/categories', 'create_category'),
+        ('GET', r'/categories/(\d+)', 'get_category'),
+        ('PATCH', r'/categories/(\d+)', 'update_category'),
+        ('DELETE', r'/categories/(\d+)', 'delete_category'),
+        ('GET', r'/products', 'list_products'),
+        ('POST', r'/products', 'create_product'),
+        ('GET', r'/products/low-stock', 'low_stock'),
+        ('GET', r'/products/(\d+)', 'get_product'),
+        ('PATCH', r'/products/(\d+)', 'update_product'),
+        ('DELETE', r'/products/(\d+)', 'delete_product'),
+        ('GET', r'/products/(\d+)/stock', 'product_stock'),
+        ('POST', r'/products/(\d+)/movements', 'move_stock'),
+        ('GET', r'/products/(\d+)/log', 'product_log'),
+        ('POST', r'/movements', 'move_stock_batch'),
+        ('GET', r'/log', 'list_log'),
+        ('GET', r'/reports/valuation', 'report_valuation'),
+        ('GET', r'/reports/movements', 'report_movements'),
+        ('GET', r'/reports/top-movers', 'report_top_movers'),
+        ('GET', r'/metrics', 'metrics'),
+    ]
+]
+
+
+class InventoryServer(HTTPServer):
+    """HTTP server that handles connections on a fixed pool of worker threads.
+    
+    A keep-alive connection holds its worker until the client closes it, so
+    workers should be at least the number of concurrent clients.
+    """
+    
+    def __init__(self, address, workers=8):
+        super().__init__(address, InventoryRequestHandler)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-worker')
+        self._open_connections = set()
+        self._connections_lock = threading.Lock()
+        # Keep one pooled connection per worker instead of reconnecting
+        get_pool(size=workers)
+        InventoryRequestHandler.batcher = MovementBatcher()
+    
+    def process_request(self, request, client_address):
+        self.executor.submit(self._handle, request, client_address)
+    
+    def _handle(self, request, client_address):
+        with self._connections_lock:
+            self._open_connections.add(request)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self._open_connections.discard(request)
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        # Wake workers blocked waiting on idle keep-alive connections
+        with self._connections_lock:
+            for request in self._open_connections:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.executor.shutdown()
+        InventoryRequestHandler.batcher.close()
+
+
+def serve(host='127.0.0.1', port=8000, workers=8):
+    """Run the API server until interrupted."""
+    server = InventoryServer((host, port), workers)
+    print(f"Serving inventory API on http://{host}:{server.server_port} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory HTTP JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--instrument', action='store_true',
+                        help="Record per-method statistics and serve them at /metrics")
+    parser.add_argument('--busy-timeout', type=int, metavar='MS',
+                        help="How long to wait for another process's write lock")
+    args = parser.parse_args()
+    
+    set_lock_policy(busy_timeout=args.busy_timeout)
+    initialize_database()
+    if args.instrument:
+        instrumentation.enable()
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Asyncio counterparts of the Category, Product, InventoryLog and Report models.
+
+Each coroutine runs the matching blocking method from models.py on an
+executor thread, so the event loop is never stalled by SQLite. Reads go
+to a pool of reader threads and run concurrently. Writes go to a single
+writer thread, so they are applied one at a time in the order they were
+awaited.
+
+Cancelling a call that has not started yet removes it from its queue, so
+it never runs. A call that is already running still finishes on its
+thread, and its result is discarded.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from models import UNCHANGED, Category, InventoryLog, Product
+from reports import Report
+
+DEFAULT_READERS = 4
+
+
+class AsyncExecutors:
+    """The reader pool and single writer thread behind the async models."""
+    
+    def __init__(self, readers=DEFAULT_READERS):
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+    
+    async def read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, func, *args)
+    
+    async def write(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, func, *args)
+    
+    def shutdown(self, wait=True):
+        self.readers.shutdown(wait=wait, cancel_futures=True)
+        self.writer.shutdown(wait=wait)
+
+
+_executors = None
+
+
+def configure(readers=DEFAULT_READERS):
+    """Replace the executors, e.g. to change the number of reader threads."""
+    global _executors
+    if _executors is not None:
+        _executors.shutdown()
+    _executors = AsyncExecutors(readers)
+    return _executors
+
+
+def shutdown():
+    """Stop the executor threads once pending writes have finished."""
+    global _executors
+    if _executors is not None:
+        _executors.shutdown()
+        _executors = None
+
+
+def _get_executors():
+    return _executors or configure()
+
+
+async def _read(func, *args):
+    return await _get_executors().read(func, *args)
+
+
+async def _write(func, *args):
+    return await _get_executors().write(func, *args)
+
+
+async def _iterate(rows, page_size):
+    """Drain a blocking row iterator page by page on the reader pool."""
+    while True:
+        page = await _read(lambda: list(islice(rows, page_size)))
+        for row in page:
+            yield row
+        if len(page) < page_size:
+            return
+
+
+class AsyncCategory:
+    @staticmethod
+    async def get_all():
+        return await _read(Category.get_all)
+    
+    @staticmethod
+    async def get_by_id(category_id):
+        return await _read(Category.get_by_id, category_id)
+    
+    @staticmethod
+    async def get_by_name(name):
+        return await _read(Category.get_by_name, name)
+    
+    @staticmethod
+    async def create(name, description=None):
+        return await _write(Category.create, name, description)
+    
+    @staticmethod
+    async def update(category_id, name=None, description=None):
+        return await _write(Category.update, category_id, name, description)
+    
+    @staticmethod
+    async def update_returning(category_id, name=None, description=None):
+        return await _write(Category.update_returning, category_id, name, description)
+    
+    @staticmethod
+    async def delete(category_id):
+        return await _write(Category.delete, category_id)
+
+
+class AsyncProduct:
+    @staticmethod
+    async def get_all():
+        return await _read(Product.get_all)
+    
+    @staticmethod
+    async def iter_all(page_size=500):
+        async for product in _iterate(Product.iter_all(page_size), page_size):
+            yield product
+    
+    @staticmethod
+    async def get_by_id(product_id):
+        return await _read(Product.get_by_id, product_id)
+    
+    @staticmethod
+    async def search(keyword, limit=None):
+        return await _read(Product.search, keyword, limit)
+    
+    @staticmethod
+    async def stock_as_of(product_id, timestamp):
+        return await _read(Product.stock_as_of, product_id, timestamp)
+    
+    @staticmethod
+    async def low_stock():
+        return await _read(Product.low_stock)
+    
+    @staticmethod
+    async def create(name, description, price, quantity, category_id):
+        return await _write(Product.create, name, description, price, quantity, category_id)
+    
+    @staticmethod
+    async def update(product_id, name=None, description=None, price=None, category_id=None):
+        return await _write(Product.update, product_id, name, description, price, category_id)
+    
+    @staticmethod
+    async def update_returning(product_id, name=None, description=None, price=None,
+                               category_id=None, reorder_threshold=UNCHANGED):
+        return await _write(Product.update_returning, product_id, name, description, price,
+                            category_id, reorder_threshold)
+    
+    @staticmethod
+    async def update_quantity(product_id, quantity_change, action, notes=None):
+        return await _write(Product.update_quantity, product_id, quantity_change, action, notes)
+    
+    @staticmethod
+    async def update_quantity_returning(product_id, quantity_change, action, notes=None):
+        return await _write(Product.update_quantity_returning, product_id, quantity_change,
+                            action, notes)
+    
+    @staticmethod
+    async def apply_movements(movements):
+        return await _write(Product.apply_movements, list(movements))
+    
+    @staticmethod
+    async def set_reorder_threshold(product_id, threshold):
+        return await _write(Product.set_reorder_threshold, product_id, threshold)
+    
+    @staticmethod
+    async def delete(product_id):
+        return await _write(Product.delete, product_id)
+
+
+class AsyncInventoryLog:
+    @staticmethod
+    async def get_all(limit=100):
+        return await _read(InventoryLog.get_all, limit)
+    
+    @staticmethod
+    async def iter_all(page_size=500):
+        async for entry in _iterate(InventoryLog.iter_all(page_size), page_size):
+            yield entry
+    
+    @staticmethod
+    async def get_by_product(product_id):
+        return await _read(InventoryLog.get_by_product, product_id)
+    
+    @staticmethod
+    async def iter_by_product(product_id, page_size=500):
+        async for entry in _iterate(InventoryLog.iter_by_product(product_id, page_size), page_size):
+            yield entry
+
+
+class AsyncReport:
+    @staticmethod
+    async def valuation_by_category():
+        return await _read(Report.valuation_by_category)
+    
+    @staticmethod
+    async def movements_by_period(period='day', start=None, end=None):
+        return await _read(Report.movements_by_period, period, start, end)
+    
+    @staticmethod
+    async def top_movers(limit=10, start=None, end=None, action=None):
+        return await _read(Report.top_movers, limit, start, end, action)
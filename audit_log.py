@@ -0,0 +1,292 @@
+"""
+Buffered writer for inventory_log entries.
+
+By default Product.update_quantity inserts its log row in the same
+transaction as the stock change. With a BufferedLogWriter installed, the
+log entry is instead appended to a spool file while that transaction is
+still open, and queued in memory once it commits. A background thread
+inserts queued entries in batched transactions once max_batch of them are
+waiting or max_delay seconds have passed.
+
+The stock change's transaction records the entry's spool sequence number
+as committed_seq in log_spools, and each batch records the highest number
+it contains as flushed_seq. A writer starting up replays the spooled
+entries between the two, skipping any the spool marks as cancelled (their
+transaction rolled back), so a crash on either side of the commit neither
+loses a movement's log entry nor logs a movement that never happened.
+With fsync=False the spool survives the process being killed; with
+fsync=True every append is fsync'd, so it also survives an OS crash or
+power loss, at the cost of one fsync per movement.
+
+Entries reach inventory_log up to max_delay after the movement, so log
+reads and reports can briefly lag behind stock levels. Each process needs
+its own spool path.
+
+Usage:
+    import audit_log
+    audit_log.enable('inventory_log.spool')
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import models
+from models import Database, is_lock_error
+
+DEFAULT_SPOOL = 'inventory_log.spool'
+
+
+class BufferedLogWriter:
+    """Spools log entries to disk and writes them to inventory_log in batches."""
+    
+    def __init__(self, spool_path=DEFAULT_SPOOL, max_batch=500, max_delay=0.05, fsync=False):
+        self.spool_path = os.path.abspath(spool_path)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self._queue = queue.Queue()
+        # Set once max_batch entries are waiting, to cut the max_delay wait short
+        self._full = threading.Event()
+        # Guards the spool file, the sequence numbers and the watermarks below
+        self._lock = threading.Lock()
+        self._seq = 0
+        # Entries are spooled in sequence order, but their transactions'
+        # threads call queue() or cancel() in any order. Entries wait in
+        # _pending until every earlier one has been queued or cancelled, so
+        # the background thread sees them in sequence order and the last
+        # entry of each batch is a contiguous watermark: _released is the
+        # highest sequence number with nothing outstanding below it
+        self._pending = {}
+        self._released = 0
+        # Every sequence number up to _flushed is in inventory_log or was
+        # cancelled; the spool is only truncated once that reaches _seq
+        self._flushed = 0
+        self._cancelled = set()
+        # A non-transient database error stops the writer; its entries stay
+        # in the spool for the next start to replay
+        self._error = None
+        self._fd = None
+        self._thread = None
+    
+    def start(self):
+        """Replay whatever a previous run left in the spool, then start writing."""
+        self.replayed = self._replay()
+        self._fd = os.open(self.spool_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        return self
+    
+    def _replay(self):
+        with Database() as db:
+            db.cursor.execute('SELECT flushed_seq, committed_seq FROM log_spools WHERE path = ?',
+                              (self.spool_path,))
+            flushed, committed = db.cursor.fetchone() or (0, None)
+        
+        entries = []
+        cancelled = set()
+        if os.path.exists(self.spool_path):
+            with open(self.spool_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Final line torn by a crash mid-append; never acknowledged
+                    if 'cancel' in entry:
+                        cancelled.add(entry['cancel'])
+                    else:
+                        entries.append(entry)
+        
+        self._seq = max([flushed, committed or 0] + [entry['seq'] for entry in entries])
+        # Entries past committed_seq were spooled by a transaction that never
+        # committed. A NULL committed_seq predates its tracking, when only
+        # committed movements were spooled
+        entries = [entry for entry in entries
+                   if flushed < entry['seq'] <= (committed or self._seq)
+                   and entry['seq'] not in cancelled]
+        if entries:
+            self._commit(entries)
+        # Everything spooled is in the database now
+        open(self.spool_path, 'w').close()
+        self._released = self._flushed = self._seq
+        return len(entries)
+    
+    def spool(self, db, product_id, action, quantity, notes=None):
+        """Spool one log entry from within db's open write transaction.
+        
+        Records the entry as committed_seq in that same transaction. Pass the
+        returned entry to queue() once the transaction commits, or to
+        cancel() if it rolls back.
+        """
+        entry = {'product_id': product_id, 'action': action, 'quantity': quantity, 'notes': notes,
+                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())}
+        with self._lock:
+            self._seq += 1
+            entry['seq'] = self._seq
+            try:
+                self._append(entry)
+            except BaseException:
+                self._release(entry['seq'], None)  # Never spooled, so nothing to replay
+                raise
+        try:
+            # Write transactions are serialized by the database, so this only
+            # ever moves forward
+            db.cursor.execute('''
+                INSERT INTO log_spools (path, flushed_seq, committed_seq) VALUES (?, 0, ?)
+                ON CONFLICT (path) DO UPDATE SET committed_seq = excluded.committed_seq
+            ''', (self.spool_path, entry['seq']))
+        except BaseException:
+            self.cancel(entry)
+            raise
+        return entry
+    
+    def queue(self, entry):
+        """Queue a spooled entry, whose transaction has committed, for the background thread."""
+        with self._lock:
+            self._release(entry['seq'], entry)
+    
+    def cancel(self, entry):
+        """Mark a spooled entry whose transaction rolled back, so replay skips it."""
+        with self._lock:
+            self._append({'cancel': entry['seq']})
+            self._release(entry['seq'], None)
+    
+    def _release(self, seq, entry):
+        # Called with the lock held; entry is None for a cancelled one
+        self._pending[seq] = entry
+        while self._released + 1 in self._pending:
+            self._released += 1
+            entry = self._pending.pop(self._released)
+            if entry is None:
+                self._cancelled.add(self._released)
+            else:
+                self._queue.put(entry)
+        self._advance()
+        if self._queue.qsize() >= self.max_batch:
+            self._full.set()
+    
+    def _advance(self):
+        # Called with the lock held: step the flushed watermark over cancelled
+        # entries, and empty the spool once nothing in it is outstanding
+        while self._flushed + 1 in self._cancelled:
+            self._flushed += 1
+            self._cancelled.remove(self._flushed)
+        if self._flushed == self._seq and self._fd is not None:
+            os.ftruncate(self._fd, 0)
+    
+    def _append(self, record):
+        os.write(self._fd, (json.dumps(record) + '\n').encode('utf-8'))
+        if self.fsync:
+            os.fsync(self._fd)
+    
+    def _commit(self, entries):
+        with Database(write=True) as db:
+            db.cursor.executemany('''
+                INSERT INTO inventory_log (product_id, action, quantity, timestamp, notes)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(entry['product_id'], entry['action'], entry['quantity'],
+                   entry['timestamp'], entry['notes']) for entry in entries])
+            # Entries arrive in sequence order, so everything up to the last
+            # one is in the log or was cancelled
+            db.cursor.execute('''
+                INSERT INTO log_spools (path, flushed_seq) VALUES (?, ?)
+                ON CONFLICT (path) DO UPDATE
+                SET flushed_seq = MAX(flushed_seq, excluded.flushed_seq)
+            ''', (self.spool_path, entries[-1]['seq']))
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            entry = self._queue.get()
+            if entry is None:
+                self._queue.task_done()
+                return
+            
+            # Let the batch fill up without waking for every entry
+            batch = [entry]
+            self._full.wait(self.max_delay)
+            self._full.clear()
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            if self._queue.qsize() >= self.max_batch:
+                self._full.set()  # Already another full batch behind this one
+            
+            # The entries are safe in the spool, so keep retrying while the
+            # database is locked. Any other error stops the writer: later
+            # batches must not move flushed_seq past entries that failed
+            delay = 0.01
+            while self._error is None:
+                try:
+                    self._commit(batch)
+                except sqlite3.Error as e:
+                    if not is_lock_error(e):
+                        self._error = e
+                        break
+                    time.sleep(delay)
+                    delay = min(delay * 2, 1.0)
+                else:
+                    with self._lock:
+                        self._flushed = max(self._flushed, batch[-1]['seq'])
+                        self._advance()
+                    break
+            
+            for _ in range(len(batch) + stopping):
+                self._queue.task_done()
+    
+    def flush(self):
+        """Block until every entry written so far is in inventory_log.
+        
+        Raises the database error that stopped the writer, if one did.
+        """
+        with self._lock:
+            target = self._seq
+        while True:
+            with self._lock:
+                released = self._released
+            self._queue.join()
+            if released >= target:
+                break
+            time.sleep(0.001)  # An earlier entry's transaction is still finishing
+        if self._error is not None:
+            raise self._error
+    
+    def close(self):
+        """Write out queued entries and stop the background thread."""
+        self._queue.put(None)
+        self._thread.join()
+        os.close(self._fd)
+
+
+_writer = None
+
+
+def enable(spool_path=DEFAULT_SPOOL, **options):
+    """Install a BufferedLogWriter for Product.update_quantity and return it."""
+    global _writer
+    disable()
+    _writer = BufferedLogWriter(spool_path, **options).start()
+    models.set_log_writer(_writer)
+    return _writer
+
+
+def disable():
+    """Go back to writing log entries directly, after flushing any buffered ones."""
+    global _writer
+    if _writer is not None:
+        models.set_log_writer(None)
+        _writer.close()
+        _writer = None
+
+
+atexit.register(disable)
@@ -0,0 +1,129 @@
+"""
+Benchmark: event-loop responsiveness with blocking vs async model calls.
+
+Runs the same mix of concurrent product lookups, searches, log reads and
+stock movements from asyncio tasks, once calling models.py directly
+(blocking the loop) and once through async_models. A ticker task that
+sleeps 1 ms measures how late the loop wakes it up; that lag is what every
+other coroutine on the loop would see.
+
+Usage: python benchmarks/bench_async_models.py [operations] [tasks]
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_models
+from async_models import AsyncInventoryLog, AsyncProduct
+from db_schema import initialize_database
+from models import InventoryLog, Product, close_all_pools
+
+PRODUCTS = 5000
+TICK = 0.001
+
+
+def prepare():
+    initialize_database()
+    conn = sqlite3.connect('inventory.db')
+    conn.executemany('INSERT INTO products (name, description, price, quantity, category_id) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((f'Item {i}', f'benchmark item {i % 97}', 9.99, 1000, 1 + i % 4)
+                      for i in range(PRODUCTS)))
+    conn.commit()
+    conn.close()
+
+
+def blocking_ops():
+    async def get(product_id):
+        return Product.get_by_id(product_id)
+
+    async def search(term):
+        return Product.search(term, limit=20)
+
+    async def log(product_id):
+        return InventoryLog.get_by_product(product_id)
+
+    async def move(product_id):
+        return Product.update_quantity(product_id, -1, 'SALE')
+
+    return get, search, log, move
+
+
+def async_ops():
+    async def search(term):
+        return await AsyncProduct.search(term, limit=20)
+
+    return AsyncProduct.get_by_id, search, AsyncInventoryLog.get_by_product, move_async
+
+
+async def move_async(product_id):
+    return await AsyncProduct.update_quantity(product_id, -1, 'SALE')
+
+
+async def ticker(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def worker(ops, count, seed):
+    get, search, log, move = ops
+    rng = random.Random(seed)
+    for _ in range(count):
+        roll = rng.random()
+        product_id = rng.randint(1, PRODUCTS)
+        if roll < 0.6:
+            await get(product_id)
+        elif roll < 0.75:
+            await search(f'item {rng.randint(1, PRODUCTS)}')
+        elif roll < 0.85:
+            await log(product_id)
+        else:
+            await move(product_id)
+
+
+async def run(ops, operations, tasks):
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(ops, operations // tasks, seed) for seed in range(tasks)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return elapsed, sorted(lags)
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    cwd = os.getcwd()
+
+    print(f"{operations} operations from {tasks} tasks, {PRODUCTS} products\n")
+    print(f"{'Mode':<16} {'ops/s':>10} {'ticks':>7} {'lag p50 (ms)':>13} {'lag p99 (ms)':>13} {'lag max (ms)':>13}")
+    print("-" * 76)
+    for mode, ops in (('blocking', blocking_ops), ('async_models', async_ops)):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            prepare()
+            elapsed, lags = asyncio.run(run(ops(), operations, tasks))
+            async_models.shutdown()
+            close_all_pools()
+            os.chdir(cwd)
+        lags = lags or [0.0]
+        print(f"{mode:<16} {operations / elapsed:>10,.0f} {len(lags):>7} "
+              f"{statistics.median(lags) * 1000:>13.2f} {lags[int(len(lags) * 0.99)] * 1000:>13.2f} "
+              f"{lags[-1] * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: Product.apply_movements vs a loop of Product.update_quantity.
+
+Applies the same stream of sale/restock movements to two copies of a
+catalog, once one call (and commit) per movement and once as a single
+batch, and reports movements per second for each.
+
+Usage: python benchmarks/bench_bulk_movements.py [movements] [products]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import initialize_database
+from models import Product, close_all_pools
+
+
+def make_movements(count, products):
+    rng = random.Random(42)
+    movements = []
+    for _ in range(count):
+        product_id = rng.randint(1, products)
+        if rng.random() < 0.8:
+            movements.append((product_id, -rng.randint(1, 3), 'SALE', 'POS sync'))
+        else:
+            movements.append((product_id, rng.randint(10, 50), 'RESTOCK', 'POS sync'))
+    return movements
+
+
+def prepare(products):
+    initialize_database()
+    conn = sqlite3.connect('inventory.db')
+    conn.executemany('INSERT INTO products (name, description, price, quantity, category_id) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((f'SKU {i}', 'benchmark item', 9.99, 100, 1) for i in range(products)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    movements = make_movements(count, products)
+    cwd = os.getcwd()
+    rates = {}
+
+    for mode in ('per-call loop', 'apply_movements'):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            prepare(products)
+            start = time.perf_counter()
+            if mode == 'per-call loop':
+                for product_id, change, action, notes in movements:
+                    Product.update_quantity(product_id, change, action, notes)
+            else:
+                Product.apply_movements(movements)
+            rates[mode] = count / (time.perf_counter() - start)
+            close_all_pools()
+            os.chdir(cwd)
+
+    print(f"\n{'Mode':<18} {'movements/sec':>15}")
+    print("-" * 34)
+    for mode, rate in rates.items():
+        print(f"{mode:<18} {rate:>15,.0f}")
+    print(f"\nSpeedup: {rates['apply_movements'] / rates['per-call loop']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
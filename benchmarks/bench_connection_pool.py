@@ -0,0 +1,58 @@
+"""
+Benchmark: connect-per-call vs pooled connections in models.Database.
+
+Runs the same point lookup used by Product.get_by_id against a scratch
+database, once opening a fresh connection per call (pool_size=0, the old
+behaviour) and once reusing pooled connections.
+
+Usage: python benchmarks/bench_connection_pool.py [iterations]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import initialize_database
+from models import Database, close_all_pools
+
+LOOKUP_SQL = '''
+    SELECT p.*, c.name as category_name
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.category_id
+    WHERE p.product_id = ?
+'''
+
+
+def run(iterations, pool_size):
+    start = time.perf_counter()
+    for i in range(iterations):
+        with Database(pool_size=pool_size) as db:
+            db.cursor.execute(LOOKUP_SQL, (i % 6 + 1,))
+            dict(db.cursor.fetchone())
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        initialize_database()
+
+        unpooled = run(iterations, pool_size=0)
+        pooled = run(iterations, pool_size=5)
+        close_all_pools()
+
+        print(f"{'Mode':<20} {'ops/sec':>12}")
+        print("-" * 33)
+        print(f"{'connect-per-call':<20} {unpooled:>12,.0f}")
+        print(f"{'pooled':<20} {pooled:>12,.0f}")
+        print(f"\nSpeedup: {pooled / unpooled:.1f}x")
+        os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
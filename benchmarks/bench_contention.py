@@ -0,0 +1,119 @@
+"""
+Multi-process contention benchmark for the model write paths.
+
+Starts several worker processes against one inventory.db and has each run
+a mix of stock movements, batched movements, product edits, creations and
+lookups for a fixed time. This is repeated under several lock policies
+(see models.set_lock_policy), from failing at once on a locked database
+to waiting on the busy timeout and retrying with backoff. Reports
+completed operations per second, failed operations, lock retries and
+tail latency for each.
+
+Usage: python benchmarks/bench_contention.py [--workers 4] [--duration 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (label, busy_timeout in ms, retries)
+POLICIES = [
+    ('no wait, no retry', 0, 0),
+    ('no wait, retry', 0, 8),
+    ('100 ms wait, retry', 100, 5),
+    ('5 s wait, retry', 5000, 5),
+]
+PRODUCTS = 1000
+
+
+def worker(directory, busy_timeout, retries, duration, seed, results):
+    os.chdir(directory)
+    from models import Product, close_all_pools, lock_stats, set_lock_policy
+    set_lock_policy(busy_timeout=busy_timeout, retries=retries)
+
+    rng = random.Random(seed)
+    operations = [
+        (60, lambda: Product.update_quantity(rng.randint(1, PRODUCTS), rng.choice((-1, 5)),
+                                             'ADJUST')),
+        (15, lambda: Product.apply_movements(
+            [(rng.randint(1, PRODUCTS), rng.choice((-1, 5)), 'ADJUST', None) for _ in range(20)])),
+        (10, lambda: Product.update(rng.randint(1, PRODUCTS), price=rng.randint(1, 500))),
+        (10, lambda: Product.get_by_id(rng.randint(1, PRODUCTS))),
+        (5, lambda: Product.create(f'Contention item {seed}-{rng.random()}', None, 1.0, 10, 1)),
+    ]
+    choices = [operation for weight, operation in operations for _ in range(weight)]
+
+    latencies = []
+    failures = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        operation = rng.choice(choices)
+        start = time.perf_counter()
+        try:
+            operation()
+        except sqlite3.OperationalError:
+            failures += 1  # DatabaseLockedError once retries run out
+        latencies.append(time.perf_counter() - start)
+    close_all_pools()
+    results.put((latencies, failures, lock_stats()['retries']))
+
+
+def run_policy(directory, busy_timeout, retries, workers, duration):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(directory, busy_timeout, retries,
+                                                      duration, seed, results))
+                 for seed in range(workers)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(latency for worker_latencies, _, _ in collected
+                       for latency in worker_latencies)
+    failures = sum(failed for _, failed, _ in collected)
+    retried = sum(retried for _, _, retried in collected)
+    return latencies, failures, retried
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    from models import close_all_pools
+    from synthetic_data import generate
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        generate(categories=10, products=PRODUCTS - 6, log_entries=20_000)
+        close_all_pools()
+
+        print(f"\n{args.workers} processes, {args.duration:g}s per policy\n")
+        print(f"{'Lock policy':<20} {'ops':>8} {'done/s':>8} {'failed':>7} {'fail %':>7} "
+              f"{'retries':>8} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+        print("-" * 84)
+        for label, busy_timeout, retries in POLICIES:
+            latencies, failures, retried = run_policy(tmp, busy_timeout, retries,
+                                                      args.workers, args.duration)
+            count = len(latencies)
+            done = (count - failures) / args.duration
+            p50 = latencies[count // 2] * 1000
+            p99 = latencies[min(int(count * 0.99), count - 1)] * 1000
+            print(f"{label:<20} {count:>8} {done:>8,.0f} {failures:>7} "
+                  f"{failures / count:>7.2%} {retried:>8} {p50:>9.2f} {p99:>9.2f}")
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: bulk product import and export through data_io.
+
+Generates a CSV of N products spread over 50 categories, imports it into
+a fresh database, re-imports it as an upsert, and exports it again.
+
+Usage: python benchmarks/bench_import.py [products]
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_io
+from db_schema import initialize_database
+from models import close_all_pools
+
+
+def write_csv(path, count):
+    rng = random.Random(7)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(data_io.PRODUCT_FIELDS)
+        for i in range(count):
+            writer.writerow([f'SKU-{i:08d}', f'Product {i}', f'Generated item number {i}',
+                             round(rng.uniform(1, 500), 2), rng.randint(0, 500),
+                             f'Category {rng.randint(1, 50)}'])
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {elapsed:>8.2f}s {count / elapsed:>14,.0f} rows/sec")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        initialize_database()
+        write_csv('products.csv', count)
+
+        print(f"\n{count:,} products")
+        timed('import (insert)', count, lambda: data_io.import_products('products.csv'))
+        timed('import (upsert)', count, lambda: data_io.import_products('products.csv'))
+        timed('export csv', count, lambda: data_io.export_products('export.csv'))
+        timed('export jsonl', count, lambda: data_io.export_products('export.jsonl'))
+
+        close_all_pools()
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
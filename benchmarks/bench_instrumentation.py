@@ -0,0 +1,69 @@
+"""
+Overhead of the instrumentation layer on hot model calls.
+
+Times Product.get_by_id, Product.search and Product.update_quantity with
+instrumentation never enabled, enabled, and enabled then disabled again
+(which should match the first run).
+
+Usage: python benchmarks/bench_instrumentation.py [--calls 20000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation
+from db_schema import initialize_database
+from models import Product, close_all_pools
+
+CALLS = [
+    ('Product.get_by_id', lambda: Product.get_by_id(1)),
+    ('Product.search', lambda: Product.search('laptop')),
+    ('Product.update_quantity', lambda: Product.update_quantity(1, 1, 'RESTOCK')),
+]
+
+
+def time_calls(call, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        call()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        initialize_database()
+
+        results = {name: [] for name, _ in CALLS}
+        for phase in ('off', 'on', 'disabled'):
+            if phase == 'on':
+                instrumentation.enable()
+            elif phase == 'disabled':
+                instrumentation.disable()
+            for name, call in CALLS:
+                count = args.calls // 10 if name == 'Product.update_quantity' else args.calls
+                time_calls(call, count // 5)  # Warm up caches before timing
+                results[name].append(time_calls(call, count))
+
+        close_all_pools()
+        os.chdir(cwd)
+
+    print(f"\n{'Method':<26} {'off (us)':>10} {'on (us)':>10} {'disabled (us)':>14} {'overhead':>9}")
+    print("-" * 73)
+    for name, (off, on, disabled) in results.items():
+        print(f"{name:<26} {off * 1e6:>10.1f} {on * 1e6:>10.1f} {disabled * 1e6:>14.1f} "
+              f"{(on - off) / off:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
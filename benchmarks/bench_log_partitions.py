@@ -0,0 +1,102 @@
+"""
+Benchmark: one year of inventory log in a single table vs monthly partitions.
+
+Fills a scratch database with a year of log entries, then measures stock
+movement latency, log tail reads (InventoryLog.get_all and
+get_by_product) and how long it takes to detach the oldest month - first
+with everything in inventory_log, then after LogPartition.rotate() has
+moved the finished months out.
+
+Usage: python benchmarks/bench_log_partitions.py [log_rows] [products]
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import apply_storage_profile, initialize_database
+from models import InventoryLog, LogPartition, Product, close_all_pools
+
+REPEAT = 200
+
+
+def prepare(log_rows, products):
+    # Only the loading connection runs as bulk-load; the models keep the default
+    initialize_database()
+    conn = sqlite3.connect('inventory.db')
+    apply_storage_profile(conn, 'bulk-load')
+    conn.executemany('INSERT INTO products (name, description, price, quantity, category_id) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((f'Item {i}', 'benchmark item', 9.99, 10 ** 9, 1) for i in range(products)))
+    # Twelve months ending last month, oldest first
+    conn.execute('''
+        WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+        INSERT INTO inventory_log (product_id, action, quantity, timestamp, notes)
+        SELECT 1 + (n * 2654435761) % ?, 'SALE', -1,
+               datetime('now', 'start of month', '-12 months',
+                        '+' || (n * 365 * 86400 / ?) || ' seconds'),
+               'benchmark movement'
+        FROM seq
+    ''', (log_rows - 1, products, log_rows))
+    conn.commit()
+    conn.close()
+
+
+def median_ms(func):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def measure(products):
+    counter = iter(range(10 ** 9))
+    results = {
+        'update_quantity': median_ms(
+            lambda: Product.update_quantity(1 + next(counter) % products, -1, 'SALE')),
+        'InventoryLog.get_all(100)': median_ms(lambda: InventoryLog.get_all(100)),
+        'InventoryLog.get_by_product': median_ms(
+            lambda: InventoryLog.get_by_product(1 + next(counter) % products)),
+    }
+    return results
+
+
+def main():
+    log_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        prepare(log_rows, products)
+        single = measure(products)
+
+        start = time.perf_counter()
+        moved = LogPartition.rotate()
+        rotate_s = time.perf_counter() - start
+        partitioned = measure(products)
+
+        oldest = LogPartition.list()[-1]['month']
+        start = time.perf_counter()
+        exported = LogPartition.detach(oldest, 'archive.db')
+        detach_s = time.perf_counter() - start
+        close_all_pools()
+        os.chdir(cwd)
+
+    print(f"\n{log_rows:,} log rows; rotate moved {moved:,} in {rotate_s:.1f}s, "
+          f"detach of {oldest} exported {exported:,} in {detach_s:.2f}s\n")
+    print(f"{'Median latency (ms)':<30} {'single table':>13} {'partitioned':>12}")
+    print("-" * 57)
+    for label in single:
+        print(f"{label:<30} {single[label]:>13.3f} {partitioned[label]:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
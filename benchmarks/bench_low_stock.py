@@ -0,0 +1,69 @@
+"""
+Benchmark: Product.low_stock vs scanning Product.get_all in Python.
+
+Builds catalogs of increasing size with a fixed number of products below
+their reorder threshold and times both ways of finding them. low_stock
+reads only the partial index, so its time should stay flat as the
+catalog grows.
+
+Usage: python benchmarks/bench_low_stock.py [alerts]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import initialize_database
+from models import Product, close_all_pools
+
+SIZES = [10000, 100000, 500000]
+REPEAT = 5
+
+
+def prepare(products, alerts):
+    initialize_database()
+    conn = sqlite3.connect('inventory.db')
+    conn.executemany('INSERT INTO products (name, description, price, quantity, category_id, '
+                     'reorder_threshold) VALUES (?, ?, ?, ?, ?, ?)',
+                     ((f'Item {i}', 'benchmark item', 9.99, 2 if i < alerts else 100, 1 + i % 4, 10)
+                      for i in range(products)))
+    conn.commit()
+    conn.close()
+
+
+def timed(func):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = func()
+    return (time.perf_counter() - start) / REPEAT * 1000, result
+
+
+def scan():
+    return [p for p in Product.get_all()
+            if p['reorder_threshold'] is not None and p['quantity'] <= p['reorder_threshold']]
+
+
+def main():
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cwd = os.getcwd()
+
+    print(f"{'Products':>10} {'alerts':>8} {'low_stock (ms)':>15} {'get_all scan (ms)':>18}")
+    print("-" * 55)
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            prepare(size, alerts)
+            indexed, found = timed(Product.low_stock)
+            scanned, expected = timed(scan)
+            assert len(found) == len(expected)
+            close_all_pools()
+            os.chdir(cwd)
+        print(f"{size:>10,} {len(found):>8} {indexed:>15.2f} {scanned:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
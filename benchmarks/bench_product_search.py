@@ -0,0 +1,85 @@
+"""
+Benchmark: FTS5 product search vs the LIKE '%keyword%' scan.
+
+Builds catalogs of 10k, 100k and 1M generated products and reports the
+median latency of Product.search (FTS5, limit 50) and of the equivalent
+LIKE query it falls back to.
+
+Usage: python benchmarks/bench_product_search.py [size ...]
+"""
+
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import initialize_database
+from models import Product, close_all_pools
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'tor', 'vak', 'sel', 'dun', 'pia', 'gor', 'bex', 'zul']
+# A 5k-word vocabulary of generated brand/model-like words
+WORDS = sorted({''.join(random.Random(i).sample(SYLLABLES, 4)) for i in range(20000)})[:5000]
+KEYWORD_COUNT = 20
+LIKE_SQL = '''
+    SELECT p.*, c.name as category_name
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.category_id
+    WHERE p.name LIKE ? OR p.description LIKE ?
+    ORDER BY p.name
+    LIMIT 50
+'''
+
+
+def populate(size):
+    rng = random.Random(size)
+    conn = sqlite3.connect('inventory.db')
+    conn.execute('PRAGMA synchronous = OFF')
+    rows = ((' '.join(rng.sample(WORDS, 2)).title(), ' '.join(rng.sample(WORDS, 5)),
+             round(rng.uniform(1, 500), 2), rng.randint(0, 200), rng.randint(1, 4))
+            for _ in range(size))
+    conn.executemany('INSERT INTO products (name, description, price, quantity, category_id) '
+                     'VALUES (?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    return conn
+
+
+def median_ms(func, keywords, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        for keyword in keywords:
+            start = time.perf_counter()
+            func(keyword)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    cwd = os.getcwd()
+
+    print(f"{'Products':>10} {'FTS5 (ms)':>12} {'LIKE (ms)':>12} {'Speedup':>9}")
+    print("-" * 46)
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            initialize_database()
+            conn = populate(size)
+            keywords = random.Random(0).sample(WORDS, KEYWORD_COUNT)
+
+            fts = median_ms(lambda keyword: Product.search(keyword, limit=50), keywords)
+            like = median_ms(lambda keyword: conn.execute(
+                LIKE_SQL, (f'%{keyword}%', f'%{keyword}%')).fetchall(), keywords)
+
+            conn.close()
+            close_all_pools()
+            os.chdir(cwd)
+        print(f"{size:>10,} {fts:>12.2f} {like:>12.2f} {like / fts:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
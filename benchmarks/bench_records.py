@@ -0,0 +1,95 @@
+"""
+Benchmark: slotted row records versus one dict per row.
+
+Loads a synthetic catalog (500k products by default) and compares the
+models' record results with the previous dict(row) conversion of the
+same query: the best-of-three time to fetch every row, and the memory
+still held by the result list.
+
+Usage: python benchmarks/bench_records.py [products] [log_entries]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database, InventoryLog, Product, close_all_pools
+from synthetic_data import generate
+
+PRODUCTS_QUERY = '''
+    SELECT p.*, c.name as category_name
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.category_id
+    ORDER BY p.name
+'''
+
+LOG_QUERY = '''
+    SELECT l.*, p.name as product_name
+    FROM inventory_log l
+    JOIN products p ON l.product_id = p.product_id
+    ORDER BY l.timestamp DESC
+    LIMIT ?
+'''
+
+
+def as_dicts(sql, params=()):
+    """The same query converted the way the models used to, one dict per row."""
+    with Database() as db:
+        db.cursor.execute(sql, params)
+        return [dict(row) for row in db.cursor.fetchall()]
+
+
+def best_time(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained_bytes(func):
+    """Memory allocated by func that is still held by its result."""
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, len(result)
+
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    log_entries = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+    cases = [
+        ('products as dicts', lambda: as_dicts(PRODUCTS_QUERY)),
+        ('Product.get_all', Product.get_all),
+        ('log as dicts', lambda: as_dicts(LOG_QUERY, (log_entries,))),
+        ('InventoryLog.get_all', lambda: InventoryLog.get_all(log_entries)),
+    ]
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        generate(categories=50, products=products, log_entries=log_entries)
+        print(f"\n{products:,} products, {log_entries:,} log entries\n")
+        print(f"{'Result':<22} {'rows':>9} {'time (ms)':>10} {'rows/s':>11} {'memory (MiB)':>13} "
+              f"{'bytes/row':>10}")
+        print("-" * 80)
+        for label, func in cases:
+            seconds = best_time(func)
+            size, rows = retained_bytes(func)
+            print(f"{label:<22} {rows:>9,} {seconds * 1000:>10.0f} {rows / seconds:>11,.0f} "
+                  f"{size / 2 ** 20:>13.1f} {size / max(rows, 1):>10.0f}")
+        close_all_pools()
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: reports.Report on a large inventory log.
+
+Fills a scratch database with a deterministic, skewed year of log entries
+(10M by default) generated inside SQLite, then times each report cold
+(computed in SQLite), warm (served from the report cache) and after a
+single new movement (the cached totals are refreshed with just that row).
+
+Usage: python benchmarks/bench_reports.py [log_rows] [products]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import apply_storage_profile, initialize_database
+from models import Product, close_all_pools
+from reports import Report
+
+ACTIONS = "CASE n % 10 WHEN 0 THEN 'RESTOCK' WHEN 1 THEN 'ADJUST' ELSE 'SALE' END"
+
+
+def prepare(log_rows, products):
+    # Only the loading connection runs as bulk-load; the models keep the default
+    initialize_database()
+    conn = sqlite3.connect('inventory.db')
+    apply_storage_profile(conn, 'bulk-load')
+    conn.executemany('INSERT INTO products (name, description, price, quantity, category_id) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((f'Item {i}', 'benchmark item', 1 + i % 50, 1000, 1 + i % 4)
+                      for i in range(products)))
+    # Product ids skew towards the low end: x * x / products for a hashed x
+    conn.execute(f'''
+        WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+        INSERT INTO inventory_log (product_id, action, quantity, timestamp)
+        SELECT 1 + ((n * 2654435761) % :p) * ((n * 2654435761) % :p) / :p,
+               {ACTIONS},
+               CASE WHEN n % 10 = 0 THEN 20 + n % 30 ELSE -(1 + n % 3) END,
+               datetime('2025-01-01', '+' || (n * 31536000 / ?) || ' seconds')
+        FROM seq
+    '''.replace(':p', str(products)), (log_rows - 1, log_rows))
+    conn.commit()
+    conn.close()
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    log_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    reports = [
+        ('valuation_by_category', Report.valuation_by_category),
+        ('movements_by_period day', lambda: Report.movements_by_period('day')),
+        ('movements_by_period week', lambda: Report.movements_by_period('week')),
+        ('movements last 30 days', lambda: Report.movements_by_period('day', start='2025-12-01')),
+        ('top_movers', lambda: Report.top_movers(10)),
+        ('top_movers SALE 30 days', lambda: Report.top_movers(10, start='2025-12-01', action='SALE')),
+    ]
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        load = timed(lambda: prepare(log_rows, products))
+        print(f"\nLoaded {log_rows:,} log rows for {products:,} products in {load / 1000:.1f}s\n")
+        print(f"{'Report':<28} {'cold (ms)':>10} {'warm (ms)':>10} {'after write (ms)':>17}")
+        print("-" * 68)
+        for label, report in reports:
+            cold = timed(report)
+            warm = timed(report)
+            Product.update_quantity(1, 1, 'RESTOCK')
+            invalidated = timed(report)
+            print(f"{label:<28} {cold:>10.1f} {warm:>10.3f} {invalidated:>17.1f}")
+        close_all_pools()
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: write throughput and read latency for each storage profile.
+
+For every preset in db_schema.STORAGE_PROFILES a fresh database is
+initialized, then timed with committed single-row stock updates (writes)
+and product point lookups (reads).
+
+Usage: python benchmarks/bench_storage_profiles.py [writes] [reads]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import STORAGE_PROFILES, initialize_database
+from models import Database, close_all_pools
+
+
+def measure_writes(profile, writes):
+    start = time.perf_counter()
+    for i in range(writes):
+        with Database(profile=profile) as db:
+            db.cursor.execute('UPDATE products SET quantity = quantity + 1 WHERE product_id = ?',
+                              (i % 6 + 1,))
+            db.cursor.execute('INSERT INTO inventory_log (product_id, action, quantity, notes) '
+                              'VALUES (?, ?, ?, ?)', (i % 6 + 1, 'RESTOCK', 1, 'benchmark'))
+    return writes / (time.perf_counter() - start)
+
+
+def measure_reads(profile, reads):
+    latencies = []
+    for i in range(reads):
+        start = time.perf_counter()
+        with Database(profile=profile) as db:
+            db.cursor.execute('SELECT * FROM products WHERE product_id = ?', (i % 6 + 1,))
+            db.cursor.fetchone()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    reads = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    cwd = os.getcwd()
+
+    print(f"{'Profile':<12} {'writes/sec':>12} {'read p50 (us)':>15} {'read p99 (us)':>15}")
+    print("-" * 57)
+    for profile in STORAGE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            initialize_database(profile)
+            write_rate = measure_writes(profile, writes)
+            p50, p99 = measure_reads(profile, reads)
+            close_all_pools()
+            os.chdir(cwd)
+        print(f"{profile:<12} {write_rate:>12,.0f} {p50 * 1e6:>15.1f} {p99 * 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Scenario benchmarks for every public model method, plus a mixed workload.
+
+Builds a scratch database with synthetic_data (same seed, same rows every
+run), times each scenario and writes the results to a JSON file. Pass
+--compare with an earlier results file to flag scenarios whose median
+latency got worse by more than --threshold; the exit status is 1 if any
+did. Two saved results files can also be compared without running.
+
+Maintenance methods (snapshots, log rotation, detach, compaction) change
+the data, so they run once each after everything else and are reported
+but never flagged.
+
+Usage: python benchmarks/bench_suite.py [--output results.json] [--compare baseline.json]
+                                        [--threshold 0.2] [--scale 1.0] [--only Product.]
+       python benchmarks/bench_suite.py --diff baseline.json results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import (Category, InventoryLog, LogPartition, Product, StockSnapshot,
+                    close_all_pools)
+from synthetic_data import NOUNS, generate, zipf_weights
+
+DATASET = {'categories': 20, 'products': 10_000, 'log_entries': 200_000, 'seed': 42}
+
+# Scenarios with fewer timed calls than this are too noisy to flag
+MIN_ITERATIONS_TO_FLAG = 5
+
+# Scenarios that work on rows created by an earlier scenario
+DEPENDS_ON = {
+    'Category.update': 'Category.create',
+    'Category.update_returning': 'Category.create',
+    'Category.delete': 'Category.create',
+    'Product.delete': 'Product.create',
+}
+
+
+class Workload:
+    """Random but repeatable arguments for the scenarios."""
+
+    def __init__(self, product_ids, seed):
+        self.rng = random.Random(seed)
+        self.product_ids = product_ids
+        # Lookups follow the same popularity skew as the generated log
+        self.popularity = zipf_weights(len(product_ids))
+        self.created_products = []
+        self.created_categories = []
+        self.counter = 0
+
+    def product(self):
+        return self.rng.choices(self.product_ids, cum_weights=self.popularity)[0]
+
+    def keyword(self):
+        return self.rng.choice(NOUNS).lower()
+
+    def timestamp(self):
+        return f'2025-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d} 12:00:00'
+
+    def unique(self):
+        self.counter += 1
+        return self.counter
+
+    def create_product(self):
+        self.created_products.append(
+            Product.create(f'Bench Item {self.unique()}', 'benchmark item', 9.99, 100, 1))
+
+    def create_category(self):
+        self.created_categories.append(Category.create(f'Bench Category {self.unique()}'))
+
+    def mixed(self):
+        """One operation of the mixed workload."""
+        roll = self.rng.random()
+        if roll < 0.60:
+            Product.get_by_id(self.product())
+        elif roll < 0.70:
+            Product.search(self.keyword(), limit=20)
+        elif roll < 0.85:
+            Product.update_quantity(self.product(), -1, 'SALE')
+        elif roll < 0.90:
+            Product.update_quantity(self.product(), 10, 'RESTOCK')
+        elif roll < 0.95:
+            InventoryLog.get_by_product(self.product())
+        else:
+            Category.get_all()
+
+
+def scenarios(w):
+    """(name, timed calls at scale 1, callable) in the order they run."""
+    return [
+        ('Category.get_all', 2000, lambda: Category.get_all()),
+        ('Category.get_by_id', 2000,
+         lambda: Category.get_by_id(w.rng.randint(1, DATASET['categories']))),
+        ('Category.get_by_name', 2000, lambda: Category.get_by_name('Electronics')),
+        ('Category.create', 200, w.create_category),
+        ('Category.update', 200,
+         lambda: Category.update(w.rng.choice(w.created_categories), description='updated')),
+        ('Category.update_returning', 200, lambda: Category.update_returning(
+            w.rng.choice(w.created_categories), description='returned')),
+        ('Category.delete', 200, lambda: Category.delete(w.created_categories.pop())),
+        ('Product.get_by_id', 2000, lambda: Product.get_by_id(w.product())),
+        ('Product.search', 200, lambda: Product.search(w.keyword(), limit=50)),
+        ('Product.search unlimited', 20, lambda: Product.search(w.keyword())),
+        ('Product.get_all', 10, lambda: Product.get_all()),
+        ('Product.iter_all', 10, lambda: sum(1 for _ in Product.iter_all())),
+        ('Product.low_stock', 100, lambda: Product.low_stock()),
+        ('Product.stock_as_of', 500, lambda: Product.stock_as_of(w.product(), w.timestamp())),
+        ('InventoryLog.get_all', 500, lambda: InventoryLog.get_all(100)),
+        ('InventoryLog.iter_all', 3, lambda: sum(1 for _ in InventoryLog.iter_all())),
+        ('InventoryLog.get_by_product', 1000, lambda: InventoryLog.get_by_product(w.product())),
+        ('InventoryLog.iter_by_product', 1000,
+         lambda: sum(1 for _ in InventoryLog.iter_by_product(w.product()))),
+        ('InventoryLog.product_history', 1000,
+         lambda: sum(1 for _ in InventoryLog.product_history(w.product())[1])),
+        ('Product.create', 500, w.create_product),
+        ('Product.update', 500, lambda: Product.update(w.product(), price=w.rng.randint(1, 500))),
+        ('Product.update_returning', 500,
+         lambda: Product.update_returning(w.product(), price=w.rng.randint(1, 500))),
+        ('Product.update_quantity', 1000,
+         lambda: Product.update_quantity(w.product(), w.rng.choice((-1, 5)), 'ADJUST')),
+        ('Product.update_quantity_returning', 1000, lambda: Product.update_quantity_returning(
+            w.product(), w.rng.choice((-1, 5)), 'ADJUST')),
+        ('Product.apply_movements (50)', 100, lambda: Product.apply_movements(
+            [(w.product(), w.rng.choice((-1, 5)), 'ADJUST', None) for _ in range(50)])),
+        ('Product.set_reorder_threshold', 500,
+         lambda: Product.set_reorder_threshold(w.product(), w.rng.choice((0, 5, 10)))),
+        ('Product.delete', 500, lambda: Product.delete(w.created_products.pop())),
+        ('mixed workload', 5000, w.mixed),
+    ]
+
+
+def maintenance():
+    """(name, callable) pairs that each run once, in order, at the end."""
+    return [
+        ('StockSnapshot.take', StockSnapshot.take),
+        ('StockSnapshot.take_if_due', StockSnapshot.take_if_due),
+        ('LogPartition.rotate', LogPartition.rotate),
+        ('LogPartition.list', LogPartition.list),
+        ('LogPartition.detach', lambda: LogPartition.detach('2025-01', 'archive-2025-01.db')),
+        ('StockSnapshot.compact_log', lambda: StockSnapshot.compact_log('9999-12-31 23:59:59')),
+    ]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    total = sum(samples)
+
+    def percentile(fraction):
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000
+
+    return {
+        'iterations': len(samples),
+        'mean_ms': total / len(samples) * 1000,
+        'p50_ms': statistics.median(samples) * 1000,
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'ops_per_s': len(samples) / total if total else None,
+    }
+
+
+def time_calls(call, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale, only):
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        start = time.perf_counter()
+        product_ids = generate(**DATASET)
+        print(f"Generated {DATASET['products']:,} products and {DATASET['log_entries']:,} log "
+              f"entries in {time.perf_counter() - start:.1f}s\n")
+
+        w = Workload(product_ids, DATASET['seed'])
+        print(f"{'Scenario':<34} {'calls':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'ops/s':>10}")
+        print("-" * 74)
+        timed = [(name, max(1, int(count * scale)), call) for name, count, call in scenarios(w)]
+        timed += [(name, 1, call) for name, call in maintenance()]
+        selected = {name for name, _, _ in timed if not only or only in name}
+        needed = selected | {DEPENDS_ON[name] for name in selected if name in DEPENDS_ON}
+        for name, count, call in timed:
+            if name not in needed:
+                continue
+            if count >= MIN_ITERATIONS_TO_FLAG:
+                time_calls(call, max(1, count // 10))  # Warm up caches
+            summary = summarize(time_calls(call, count))
+            if name not in selected:
+                continue
+            results[name] = summary
+            print(f"{name:<34} {count:>6} {summary['p50_ms']:>10.3f} {summary['p95_ms']:>10.3f} "
+                  f"{summary['ops_per_s'] or 0:>10,.0f}")
+        close_all_pools()
+        os.chdir(cwd)
+
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'dataset': DATASET,
+            'scale': scale,
+        },
+        'scenarios': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print the change in median latency per scenario; returns the regressed names."""
+    print(f"\nComparing against {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta']['created']})\n")
+    print(f"{'Scenario':<34} {'before (ms)':>12} {'after (ms)':>12} {'change':>8}")
+    print("-" * 70)
+    regressions = []
+    for name, after in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            print(f"{name:<34} {'-':>12} {after['p50_ms']:>12.3f} {'new':>8}")
+            continue
+        change = after['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0
+        flag = ''
+        if min(before['iterations'], after['iterations']) >= MIN_ITERATIONS_TO_FLAG:
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append(name)
+            elif change < -threshold:
+                flag = '  faster'
+        print(f"{name:<34} {before['p50_ms']:>12.3f} {after['p50_ms']:>12.3f} "
+              f"{change:>+8.1%}{flag}")
+    print(f"\n{len(regressions)} regressions beyond {threshold:.0%}.")
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--output', help="Results file (default: bench_suite-<time>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="Flag regressions against this run")
+    parser.add_argument('--diff', nargs=2, metavar=('BASELINE', 'RESULTS'),
+                        help="Compare two saved results files without running")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown of the median that counts as a regression")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply the calls per scenario")
+    parser.add_argument('--only', help="Run only scenarios whose name contains this text")
+    args = parser.parse_args()
+
+    if args.diff:
+        regressions = compare(load(args.diff[0]), load(args.diff[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    results = run(args.scale, args.only)
+    output = args.output or f"bench_suite-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        regressions = compare(load(args.compare), results, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Consistency check for late log entries and monthly partitions.
+
+Rotates two months of the log into partitions, then logs a back-dated
+entry for the older month and rotates again, so the older partition ends
+up holding the highest log id. Checks that newest_log_id finds it, that
+movement reports (fresh and incrementally refreshed) count it, and that
+a stock snapshot records it as its last_log_id. Exits non-zero on any
+mismatch.
+
+Usage: python benchmarks/check_log_partitions.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import initialize_database
+from models import Database, LogPartition, StockSnapshot, close_all_pools, newest_log_id
+from reports import Report, _report_cache
+
+WINDOW = ('2024-08-01 00:00:00', '2024-10-01 00:00:00')
+
+
+def log(conn, timestamp, quantity=-1):
+    conn.execute('INSERT INTO inventory_log (product_id, action, quantity, timestamp) '
+                 "VALUES (1, 'SALE', ?, ?)", (quantity, timestamp))
+    conn.commit()
+
+
+def expected_movements():
+    """movements_by_period('month') over WINDOW, summed straight from every log table."""
+    with Database() as db:
+        db.cursor.execute("SELECT name FROM log_partitions WHERE detached_to IS NULL")
+        tables = ['inventory_log', 'inventory_log_archive'] + [row[0] for row in db.cursor]
+        rows = ' UNION ALL '.join(f'SELECT action, quantity, timestamp FROM {table}'
+                                  for table in tables)
+        db.cursor.execute(f'''
+            SELECT date(timestamp, 'start of month'), action,
+                   COUNT(*), SUM(ABS(quantity)), SUM(quantity)
+            FROM ({rows}) WHERE timestamp >= ? AND timestamp < ?
+            GROUP BY 1, 2 ORDER BY 1, 2
+        ''', WINDOW)
+        return [{'period': period, 'action': action, 'entries': entries,
+                 'units': units, 'net': net}
+                for period, action, entries, units, net in db.cursor.fetchall()]
+
+
+def main():
+    cwd = os.getcwd()
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        initialize_database()
+        conn = sqlite3.connect('inventory.db')
+
+        log(conn, '2024-08-10 09:00:00')
+        log(conn, '2024-08-20 09:00:00')
+        log(conn, '2024-09-05 09:00:00')
+        log(conn, '2024-09-25 09:00:00')
+        LogPartition.rotate('2024-10-01')
+        Report.movements_by_period('month', *WINDOW)  # Cached before the late entry
+
+        log(conn, '2024-08-31 23:00:00', -5)  # Arrives late, dated in August
+        late_id = conn.execute('SELECT MAX(log_id) FROM inventory_log').fetchone()[0]
+        LogPartition.rotate('2024-10-01')
+        conn.close()
+
+        partitions = {row['month']: row['last_log_id'] for row in LogPartition.list()}
+        checks.append(('late entry lands in the older partition',
+                       partitions['2024-08'] == late_id > partitions['2024-09']))
+
+        with Database() as db:
+            newest = newest_log_id(db)
+        checks.append((f'newest_log_id is {late_id}', newest == late_id))
+
+        expected = expected_movements()
+        checks.append(('movements_by_period refreshed from cache',
+                       Report.movements_by_period('month', *WINDOW) == expected))
+        _report_cache.clear()
+        checks.append(('movements_by_period computed fresh',
+                       Report.movements_by_period('month', *WINDOW) == expected))
+
+        StockSnapshot.take()
+        with Database() as db:
+            db.cursor.execute('SELECT MAX(last_log_id) FROM stock_snapshots')
+            snapshot_log_id = db.cursor.fetchone()[0]
+        checks.append((f'snapshot records last_log_id {late_id}', snapshot_log_id == late_id))
+
+        close_all_pools()
+        os.chdir(cwd)
+
+    failures = 0
+    for name, ok in checks:
+        print(f"{'ok' if ok else 'FAIL':<4} {name}")
+        failures += not ok
+    print(f"\n{failures} failed checks.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Query-plan regression check for models.py.
+
+Runs every Category, Product, InventoryLog and LogPartition method against a scratch
+database, captures the SQL they issue, and runs EXPLAIN QUERY PLAN on each
+read/update/delete statement. Exits non-zero if any plan falls back to a
+full table scan or sorts through a temporary b-tree.
+
+Usage: python benchmarks/check_query_plans.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import initialize_database
+from models import (Category, InventoryLog, LogPartition, Product, StockSnapshot,
+                    close_all_pools, get_pool)
+
+
+def exercise_models():
+    """Create scratch rows and return (method name, callable) pairs to trace."""
+    category_id = Category.create('Plan Check', 'temporary')
+    product_id = Product.create('Plan Widget', 'temporary', 1.0, 5, category_id)
+    calls = [
+        ('Category.get_all', lambda: Category.get_all()),
+        ('Category.get_by_id', lambda: Category.get_by_id(category_id)),
+        ('Category.update', lambda: Category.update(category_id, description='updated')),
+        ('Category.update_returning',
+         lambda: Category.update_returning(category_id, description='returned')),
+        ('Product.get_all', lambda: Product.get_all()),
+        ('Product.iter_all', lambda: list(Product.iter_all(page_size=1))),
+        ('Product.get_by_id', lambda: Product.get_by_id(product_id)),
+        ('Product.search', lambda: Product.search('Widget')),
+        ('Product.update', lambda: Product.update(product_id, price=2.0)),
+        ('Product.update_quantity', lambda: Product.update_quantity(product_id, 1, 'RESTOCK')),
+        ('Product.update_returning', lambda: Product.update_returning(product_id, price=3.0)),
+        ('Product.update_quantity_returning',
+         lambda: Product.update_quantity_returning(product_id, 1, 'RESTOCK')),
+        ('Product.apply_movements',
+         lambda: Product.apply_movements([(product_id, 1, 'RESTOCK', None)])),
+        ('Product.set_reorder_threshold', lambda: Product.set_reorder_threshold(product_id, 10)),
+        ('Product.low_stock', lambda: Product.low_stock()),
+        ('StockSnapshot.take', lambda: StockSnapshot.take()),
+        ('Product.stock_as_of', lambda: Product.stock_as_of(product_id, '2999-01-01')),
+        ('StockSnapshot.compact_log', lambda: StockSnapshot.compact_log('2000-01-01')),
+        # Move everything into a partition so the log reads below span both
+        ('LogPartition.rotate', lambda: LogPartition.rotate('2999-01-01')),
+        ('Product.update_quantity', lambda: Product.update_quantity(product_id, 1, 'RESTOCK')),
+        ('StockSnapshot.take', lambda: StockSnapshot.take()),
+        ('Product.stock_as_of', lambda: Product.stock_as_of(product_id, '2999-01-01')),
+        ('InventoryLog.get_all', lambda: InventoryLog.get_all(10)),
+        ('InventoryLog.iter_all', lambda: list(InventoryLog.iter_all(page_size=1))),
+        ('InventoryLog.get_by_product', lambda: InventoryLog.get_by_product(product_id)),
+        ('InventoryLog.iter_by_product',
+         lambda: list(InventoryLog.iter_by_product(product_id, page_size=1))),
+        ('InventoryLog.product_history',
+         lambda: list(InventoryLog.product_history(product_id, page_size=1)[1])),
+        ('LogPartition.list', lambda: LogPartition.list()),
+        ('LogPartition.detach',
+         lambda: LogPartition.detach(LogPartition.list()[0]['month'], 'log_archive.db')),
+        ('Product.delete', lambda: Product.delete(product_id)),
+        ('Category.delete', lambda: Category.delete(category_id)),
+    ]
+    return calls
+
+
+def is_table_query(sql):
+    """True for the SELECT/UPDATE/DELETE statements issued by the models."""
+    sql = sql.strip()
+    return sql.upper().startswith(('SELECT', 'UPDATE', 'DELETE')) and sql != 'SELECT 1'
+
+
+def plan_problems(conn, sql):
+    """Return the plan lines of sql that indicate a full scan or temp sort."""
+    problems = []
+    for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}'):
+        detail = row[-1]
+        # Virtual tables (the FTS5 index) report their own lookups as SCAN,
+        # and a SELECT of scalar subqueries scans a single constant row
+        full_scan = (detail.startswith('SCAN ') and ' USING ' not in detail
+                     and 'VIRTUAL TABLE' not in detail and detail != 'SCAN CONSTANT ROW')
+        if full_scan or 'USE TEMP B-TREE' in detail:
+            problems.append(detail)
+    return problems
+
+
+def main():
+    cwd = os.getcwd()
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        initialize_database()
+
+        # A single pooled connection serves every call, so tracing it sees
+        # all of the SQL the models issue.
+        pool = get_pool(size=1)
+        conn = pool.acquire()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        pool.release(conn)
+
+        for name, call in exercise_models():
+            del statements[:]
+            call()
+            queries = [sql.strip() for sql in statements if is_table_query(sql)]
+            if not queries:
+                print(f"FAIL {name}: no SQL captured")
+                failures += 1
+                continue
+            for sql in queries:
+                try:
+                    problems = plan_problems(conn, sql)
+                except sqlite3.OperationalError as e:
+                    # The call dropped or detached a table it had just read
+                    print(f"skip {name}: {' '.join(sql.split())[:70]} ({e})")
+                    continue
+                status = 'FAIL' if problems else 'ok'
+                print(f"{status:<4} {name}: {' '.join(sql.split())[:70]}")
+                for detail in problems:
+                    print(f"       -> {detail}")
+                failures += bool(problems)
+
+        conn.set_trace_callback(None)
+        close_all_pools()
+        os.chdir(cwd)
+
+    print(f"\n{failures} problem queries found.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Load test for api_server: latency percentiles and throughput.
+
+Starts an API server on a scratch database (or targets --url), then runs
+concurrent keep-alive clients issuing a mix of product lookups, searches
+and single stock movements for a fixed duration.
+
+Usage: python benchmarks/load_test_api.py [--clients 8] [--duration 10] [--url http://host:port]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (weight, label) for the request mix
+MIX = [(80, 'get product'), (10, 'search'), (10, 'movement')]
+SEARCH_TERMS = ['laptop', 'shirt', 'chair', 'rice', 'phone']
+
+
+def client(host, port, product_ids, stop, samples, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port)
+    labels = [label for weight, label in MIX for _ in range(weight)]
+    while not stop.is_set():
+        label = rng.choice(labels)
+        product_id = rng.choice(product_ids)
+        if label == 'get product':
+            method, path, body = 'GET', f'/products/{product_id}', None
+        elif label == 'search':
+            method, path, body = 'GET', f'/products?q={rng.choice(SEARCH_TERMS)}&limit=20', None
+        else:
+            change = rng.choice([-1, 1, 2])
+            method, path = 'POST', f'/products/{product_id}/movements'
+            body = json.dumps({'quantity_change': change,
+                               'action': 'SALE' if change < 0 else 'RESTOCK'})
+        start = time.perf_counter()
+        conn.request(method, path, body, {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        samples.append((label, time.perf_counter() - start, response.status))
+    conn.close()
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(host, port, clients, duration):
+    conn = http.client.HTTPConnection(host, port)
+    conn.request('GET', '/products')
+    product_ids = [product['product_id'] for product in json.loads(conn.getresponse().read())]
+    conn.close()
+
+    stop = threading.Event()
+    samples = []
+    threads = [threading.Thread(target=client, args=(host, port, product_ids, stop, samples, seed))
+               for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"\n{clients} clients, {duration}s: {len(samples) / duration:,.0f} req/s\n")
+    print(f"{'Request':<14} {'count':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>8}")
+    print("-" * 54)
+    for label in [label for _, label in MIX] + ['all']:
+        chosen = [s for s in samples if label in ('all', s[0])]
+        if not chosen:
+            continue
+        latencies = sorted(s[1] for s in chosen)
+        errors = sum(1 for s in chosen if s[2] >= 500)
+        print(f"{label:<14} {len(chosen):>8} {statistics.median(latencies) * 1000:>10.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>10.2f} {errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--url', help="Target a running server instead of starting one")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        run(url.hostname, url.port or 80, args.clients, args.duration)
+        return
+
+    from api_server import InventoryServer
+    from db_schema import initialize_database
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        initialize_database()
+        server = InventoryServer(('127.0.0.1', 0), workers=args.clients + 2)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            run('127.0.0.1', server.server_port, args.clients, args.duration)
+        finally:
+            server.shutdown()
+            server.server_close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Multi-process stress test for Product.update_quantity.
+
+Several worker processes apply random sales and restocks to the same few
+products at once. Afterwards every product's stock must equal its initial
+stock plus the sum of the deltas the workers saw succeed, and must never
+be negative. Exits non-zero on any lost or phantom update.
+
+Usage: python benchmarks/stress_update_quantity.py [workers] [updates_per_worker]
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import initialize_database
+from models import Product
+
+PRODUCT_IDS = [1, 2, 3]
+
+
+def worker(seed, updates, results):
+    rng = random.Random(seed)
+    applied = {product_id: 0 for product_id in PRODUCT_IDS}
+    for _ in range(updates):
+        product_id = rng.choice(PRODUCT_IDS)
+        change = rng.choice([-2, -1, 1, 2])
+        action = 'SALE' if change < 0 else 'RESTOCK'
+        if Product.update_quantity(product_id, change, action, f'stress worker {seed}'):
+            applied[product_id] += change
+    results.put(applied)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        initialize_database()
+        initial = {pid: Product.get_by_id(pid)['quantity'] for pid in PRODUCT_IDS}
+
+        # Spawn rather than fork: the pooled connections opened above must
+        # not be inherited and reused by the workers
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(seed, updates, results))
+                     for seed in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = {pid: 0 for pid in PRODUCT_IDS}
+        for _ in processes:
+            for pid, change in results.get().items():
+                totals[pid] += change
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failures = 0
+        for pid in PRODUCT_IDS:
+            expected = initial[pid] + totals[pid]
+            actual = Product.get_by_id(pid)['quantity']
+            status = 'ok' if actual == expected and actual >= 0 else 'FAIL'
+            failures += status == 'FAIL'
+            print(f"{status:<4} product {pid}: initial {initial[pid]}, "
+                  f"expected {expected}, actual {actual}")
+        os.chdir(cwd)
+
+    print(f"\n{workers * updates:,} updates from {workers} processes in {elapsed:.2f}s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Deterministic synthetic inventory data for benchmarks.
+
+populate() adds categories, products and inventory log entries to a
+database with the kind of skew a real shop has: a few large categories
+and a long tail of small ones, prices spread over orders of magnitude,
+and a small set of best sellers that account for most stock movements
+(Zipf-distributed). Log entries run in time order over one year and
+about one product in fifty is at or below its reorder threshold.
+
+The same seed and sizes always produce the same rows, so benchmark runs
+on different machines or commits measure the same data.
+
+Usage: python benchmarks/synthetic_data.py [--categories 20] [--products 10000]
+                                           [--log-entries 200000] [--seed 42] [directory]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_schema import apply_storage_profile, initialize_database
+
+ADJECTIVES = ['Classic', 'Compact', 'Deluxe', 'Eco', 'Ergonomic', 'Heavy-duty', 'Lightweight',
+              'Mini', 'Portable', 'Premium', 'Pro', 'Smart', 'Vintage', 'Wireless', 'Organic']
+NOUNS = ['Laptop', 'Phone', 'Shirt', 'Jacket', 'Rice', 'Coffee', 'Chair', 'Desk', 'Lamp',
+         'Kettle', 'Headphones', 'Backpack', 'Bottle', 'Blender', 'Monitor', 'Sofa', 'Towel',
+         'Keyboard', 'Sneakers', 'Tea']
+DEPARTMENTS = ['Electronics', 'Clothing', 'Groceries', 'Furniture', 'Kitchen', 'Sports', 'Toys',
+               'Garden', 'Books', 'Beauty', 'Office', 'Pets', 'Automotive', 'Health', 'Music']
+
+LOG_START = datetime(2025, 1, 1)
+LOG_SPAN = timedelta(days=365)
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative Zipf weights for ranks 1..count, for random.choices(cum_weights=...)."""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def populate(conn, categories=20, products=10_000, log_entries=200_000, seed=42):
+    """Insert the synthetic rows through conn and commit; returns the new product ids."""
+    rng = random.Random(seed)
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        'INSERT INTO categories (name, description) VALUES (?, ?)',
+        ((f'{DEPARTMENTS[i % len(DEPARTMENTS)]} {i // len(DEPARTMENTS) + 1:03d}',
+          f'Synthetic category {i}') for i in range(categories)))
+    category_ids = [row[0] for row in cursor.execute(
+        'SELECT category_id FROM categories ORDER BY category_id DESC LIMIT ?', (categories,))]
+    category_ids.reverse()
+    category_weights = zipf_weights(len(category_ids), 0.8)
+
+    rows = []
+    for i in range(products):
+        noun = rng.choice(NOUNS)
+        price = round(min(rng.lognormvariate(3.5, 1.2), 20_000), 2)
+        threshold = rng.choice((0, 0, 5, 10, 20))
+        if threshold and rng.random() < 0.1:
+            quantity = rng.randint(0, threshold)  # Low on stock
+        else:
+            quantity = threshold + 1 + int(rng.expovariate(1 / 80))
+        rows.append((f'{rng.choice(ADJECTIVES)} {noun} {i:06d}',
+                     f'{noun.lower()} model {rng.randint(100, 999)}', price, quantity,
+                     rng.choices(category_ids, cum_weights=category_weights)[0], threshold))
+    cursor.executemany('INSERT INTO products (name, description, price, quantity, category_id, '
+                       'reorder_threshold) VALUES (?, ?, ?, ?, ?, ?)', rows)
+    product_ids = [row[0] for row in cursor.execute(
+        'SELECT product_id FROM products ORDER BY product_id DESC LIMIT ?', (products,))]
+    product_ids.reverse()
+
+    # Popularity is independent of insertion order, so best sellers are
+    # spread through the id range rather than all at the start
+    by_popularity = product_ids[:]
+    rng.shuffle(by_popularity)
+    popularity = zipf_weights(len(by_popularity))
+    total = popularity[-1]
+    step = LOG_SPAN.total_seconds() / max(log_entries, 1)
+
+    def log_rows():
+        for n in range(log_entries):
+            product_id = by_popularity[bisect_left(popularity, rng.random() * total)]
+            roll = rng.random()
+            if roll < 0.85:
+                action, quantity = 'SALE', -rng.choice((1, 1, 1, 2, 3))
+            elif roll < 0.97:
+                action, quantity = 'RESTOCK', rng.choice((10, 20, 50, 100))
+            else:
+                action, quantity = 'ADJUST', rng.choice((-2, -1, 1, 2))
+            timestamp = LOG_START + timedelta(seconds=int(n * step))
+            yield (product_id, action, quantity, timestamp.strftime('%Y-%m-%d %H:%M:%S'), None)
+
+    cursor.executemany('INSERT INTO inventory_log (product_id, action, quantity, timestamp, notes) '
+                       'VALUES (?, ?, ?, ?, ?)', log_rows())
+    conn.commit()
+    return product_ids
+
+
+def generate(categories=20, products=10_000, log_entries=200_000, seed=42):
+    """Create inventory.db in the current directory and fill it with synthetic data."""
+    # Only the loading connection runs as bulk-load; the models keep the default
+    initialize_database()
+    conn = sqlite3.connect('inventory.db')
+    apply_storage_profile(conn, 'bulk-load')
+    try:
+        return populate(conn, categories, products, log_entries, seed)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('directory', nargs='?', default='.',
+                        help="Where to create inventory.db (default: current directory)")
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--log-entries', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    os.chdir(args.directory)
+    start = time.perf_counter()
+    generate(args.categories, args.products, args.log_entries, args.seed)
+    print(f"Generated {args.categories} categories, {args.products:,} products and "
+          f"{args.log_entries:,} log entries in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
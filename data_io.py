@@ -0,0 +1,317 @@
+"""
+Bulk import and export of products and categories as CSV or JSON Lines.
+
+Files are streamed: imports read and commit chunk_size rows at a time and
+exports write rows straight from the database cursor, so memory use does
+not grow with the file size.
+
+CSV files need a header row. Product records use the fields sku, name,
+description, price, quantity and category (a category name); category
+records use name and description.
+"""
+
+import csv
+import json
+import math
+import os
+from itertools import islice
+
+from db_schema import PRODUCT_SEARCH_TRIGGERS
+from models import MAX_SQL_PARAMS, Database
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Maintaining products_fts one row at a time through its triggers is several
+# times slower than feeding it directly, so product imports drop these
+# triggers for each chunk and update the index themselves
+SUSPENDED_TRIGGERS = ('products_fts_insert', 'products_fts_update')
+
+PRODUCT_FIELDS = ['sku', 'name', 'description', 'price', 'quantity', 'category']
+CATEGORY_FIELDS = ['name', 'description']
+
+
+def detect_format(path):
+    """Infer 'csv' or 'jsonl' from a file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.json', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Cannot tell the format of {path!r}; use csv or jsonl")
+
+
+def _read_records(path, fmt):
+    """Yield one dict per record in the file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _chunks(records, chunk_size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _text(value):
+    """Normalize an optional text field; empty CSV cells become None."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _category_row(record):
+    """Validate a category record; returns (name, description).
+    
+    Raises ValueError if the name is missing.
+    """
+    name = _text(record.get('name'))
+    if name is None:
+        raise ValueError("name is missing")
+    return name, _text(record.get('description'))
+
+
+def import_categories(path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, rejected=None):
+    """Insert categories, updating the description of any with the same name.
+    
+    A blank description leaves an existing category's description as it is.
+    A record with a missing name is skipped; if rejected is a list, (record
+    number, reason) is appended to it for each. Returns the number of
+    records imported.
+    """
+    fmt = fmt or detect_format(path)
+    count = 0
+    number = 0
+    with Database(pool_size=0, profile='bulk-load') as db:
+        for chunk in _chunks(_read_records(path, fmt), chunk_size):
+            rows = []
+            for record in chunk:
+                number += 1
+                try:
+                    rows.append(_category_row(record))
+                except ValueError as e:
+                    if rejected is not None:
+                        rejected.append((number, str(e)))
+            
+            db.cursor.executemany('''
+                INSERT INTO categories (name, description) VALUES (?, ?)
+                ON CONFLICT (name) DO UPDATE
+                SET description = COALESCE(excluded.description, description)
+            ''', rows)
+            db.conn.commit()
+            count += len(rows)
+    return count
+
+
+def _product_row(record):
+    """Validate a product record; returns (sku, name, description, price, quantity, category).
+    
+    Raises ValueError describing the first bad field.
+    """
+    name = _text(record.get('name'))
+    if name is None:
+        raise ValueError("name is missing")
+    
+    value = record.get('price')
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        price = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"price {value!r} is not a number") from None
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(f"price {value!r} must be zero or more")
+    
+    quantity = record.get('quantity')
+    try:
+        if isinstance(quantity, bool):
+            raise ValueError
+        number = float(quantity)
+        if not number.is_integer():
+            raise ValueError
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"quantity {quantity!r} is not a whole number") from None
+    if number < 0:
+        raise ValueError(f"quantity {quantity!r} must be zero or more")
+    
+    return (_text(record.get('sku')), name, _text(record.get('description')), price,
+            int(number), _text(record.get('category')))
+
+
+def import_products(path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, rejected=None):
+    """Insert products, or update existing ones that have the same sku.
+    
+    Category names are resolved through an in-memory map and unknown ones
+    are created. Every new product and every quantity change is recorded in
+    inventory_log as an IMPORT entry. A record with a missing name or a bad
+    price or quantity is skipped; if rejected is a list, (record number,
+    reason) is appended to it for each. Returns the number of records
+    imported.
+    """
+    fmt = fmt or detect_format(path)
+    count = 0
+    number = 0
+    with Database(pool_size=0, profile='bulk-load') as db:
+        db.cursor.execute('SELECT name, category_id FROM categories')
+        categories = dict(db.cursor.fetchall())
+        
+        db.cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (?, ?)",
+                          SUSPENDED_TRIGGERS)
+        sync_search = db.cursor.fetchone()[0] == len(SUSPENDED_TRIGGERS)
+        
+        for chunk in _chunks(_read_records(path, fmt), chunk_size):
+            rows = []
+            for record in chunk:
+                number += 1
+                try:
+                    rows.append(_product_row(record))
+                except ValueError as e:
+                    if rejected is not None:
+                        rejected.append((number, str(e)))
+            
+            # sqlite3 would commit the DROP TRIGGER on its own; an explicit
+            # transaction keeps it with the chunk, so a failure rolls back
+            # to the triggers being in place
+            db.conn.execute('BEGIN IMMEDIATE')
+            if sync_search:
+                for trigger in SUSPENDED_TRIGGERS:
+                    db.cursor.execute(f'DROP TRIGGER {trigger}')
+            _import_product_chunk(db, rows, categories, sync_search)
+            if sync_search:
+                for trigger in SUSPENDED_TRIGGERS:
+                    db.cursor.execute(PRODUCT_SEARCH_TRIGGERS[trigger])
+            # The triggers are back before commit, so no other connection
+            # ever sees products_fts out of step
+            db.conn.commit()
+            count += len(rows)
+    return count
+
+
+def _select_by_sku(db, columns, skus):
+    """Yield (sku, *columns) rows for the given skus, in IN-list batches."""
+    for start in range(0, len(skus), MAX_SQL_PARAMS):
+        part = skus[start:start + MAX_SQL_PARAMS]
+        placeholders = ', '.join('?' * len(part))
+        db.cursor.execute(f'SELECT sku, {columns} FROM products WHERE sku IN ({placeholders})', part)
+        yield from db.cursor.fetchall()
+
+
+def _import_product_chunk(db, products, categories, sync_search):
+    rows = []
+    for sku, name, description, price, quantity, category in products:
+        category_id = None
+        if category is not None:
+            category_id = categories.get(category)
+            if category_id is None:
+                db.cursor.execute('INSERT INTO categories (name) VALUES (?)', (category,))
+                category_id = categories[category] = db.cursor.lastrowid
+        rows.append((sku, name, description, price, quantity, category_id))
+    
+    # Products this chunk will update: current stock to log the change, and
+    # the indexed text to remove from products_fts
+    skus = list({row[0] for row in rows if row[0] is not None})
+    stock = {}
+    stale_text = []
+    for sku, quantity, product_id, name, description in _select_by_sku(
+            db, 'quantity, product_id, name, description', skus):
+        stock[sku] = quantity
+        stale_text.append((product_id, name, description))
+    if sync_search:
+        stale_text.sort()  # FTS5 updates much faster in rowid order
+        db.cursor.executemany('''
+            INSERT INTO products_fts (products_fts, rowid, name, description)
+            VALUES ('delete', ?, ?, ?)
+        ''', stale_text)
+    
+    keyed_rows = []
+    changes = []
+    log_rows = []
+    search_rows = []
+    for row in rows:
+        sku, quantity = row[0], row[4]
+        if sku is None:
+            # No natural key: always a new product
+            db.cursor.execute('''
+                INSERT INTO products (sku, name, description, price, quantity, category_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', row)
+            log_rows.append((db.cursor.lastrowid, 'IMPORT', quantity, 'Bulk import'))
+            search_rows.append((db.cursor.lastrowid, row[1], row[2]))
+            continue
+        
+        keyed_rows.append(row)
+        change = quantity - stock.get(sku, 0)
+        if sku not in stock or change:
+            changes.append((sku, change))
+        stock[sku] = quantity
+    
+    db.cursor.executemany('''
+        INSERT INTO products (sku, name, description, price, quantity, category_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (sku) DO UPDATE SET
+            name = excluded.name, description = excluded.description,
+            price = excluded.price, quantity = excluded.quantity,
+            category_id = excluded.category_id, updated_at = CURRENT_TIMESTAMP
+    ''', keyed_rows)
+    
+    product_ids = dict(_select_by_sku(db, 'product_id', skus))
+    log_rows.extend((product_ids[sku], 'IMPORT', change, 'Bulk import') for sku, change in changes)
+    db.cursor.executemany('''
+        INSERT INTO inventory_log (product_id, action, quantity, notes)
+        VALUES (?, ?, ?, ?)
+    ''', log_rows)
+    
+    if sync_search:
+        # Index the final text of each product; later rows for a sku win
+        text = {row[0]: (row[1], row[2]) for row in keyed_rows}
+        search_rows.extend((product_ids[sku],) + text[sku] for sku in skus)
+        search_rows.sort()
+        db.cursor.executemany('''
+            INSERT INTO products_fts (rowid, name, description) VALUES (?, ?, ?)
+        ''', search_rows)
+
+
+def _write_records(path, fmt, fields, rows):
+    """Write rows (sequences ordered like fields); return how many were written."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(fields, row))) + '\n')
+                count += 1
+    return count
+
+
+def export_categories(path, fmt=None):
+    """Write every category to path; returns the number written."""
+    fmt = fmt or detect_format(path)
+    with Database() as db:
+        db.cursor.execute('SELECT name, description FROM categories ORDER BY name')
+        return _write_records(path, fmt, CATEGORY_FIELDS, db.cursor)
+
+
+def export_products(path, fmt=None):
+    """Write every product to path; returns the number written."""
+    fmt = fmt or detect_format(path)
+    with Database() as db:
+        db.cursor.execute('''
+            SELECT p.sku, p.name, p.description, p.price, p.quantity, c.name
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.category_id
+            ORDER BY p.product_id
+        ''')
+        return _write_records(path, fmt, PRODUCT_FIELDS, db.cursor)
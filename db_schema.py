@@ -1,13 +1,293 @@
 import sqlite3
 import os
 
-# Function to initialize the database
-def initialize_database():
+# Named storage presets. Every preset runs in WAL mode so readers don't block
+# the writer; they differ in how hard commits are flushed to disk and how much
+# memory SQLite may use for its page cache and memory-mapped I/O.
+STORAGE_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,        # ~16 MB
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,        # ms
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,        # ~64 MB
+        'mmap_size': 268435456,      # 256 MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -262144,       # ~256 MB
+        'mmap_size': 1073741824,     # 1 GB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    },
+}
+
+DEFAULT_STORAGE_PROFILE = 'balanced'
+
+
+def apply_storage_profile(conn, profile=DEFAULT_STORAGE_PROFILE):
+    """Apply the pragmas of a named storage profile to an open connection."""
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {profile!r}")
+    for pragma, value in STORAGE_PROFILES[profile].items():
+        conn.execute(f'PRAGMA {pragma} = {value}')
+
+
+def save_storage_profile(conn, profile):
+    """Record profile as the one every connection to this database should use."""
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {profile!r}")
+    conn.execute("INSERT OR REPLACE INTO storage_settings (name, value) VALUES ('profile', ?)",
+                 (profile,))
+
+
+def stored_storage_profile(conn):
+    """The profile saved by initialize_database, or None if there is none."""
+    try:
+        row = conn.execute("SELECT value FROM storage_settings WHERE name = 'profile'").fetchone()
+    except sqlite3.OperationalError:
+        return None  # Not initialized, or older than the storage_settings table
+    return row[0] if row and row[0] in STORAGE_PROFILES else None
+
+
+def fts5_available(conn):
+    """Check whether this SQLite build was compiled with FTS5."""
+    return conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0] == 1
+
+
+# Triggers that keep products_fts in step with the products table
+PRODUCT_SEARCH_TRIGGERS = {
+    'products_fts_insert': '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, description)
+        VALUES (new.product_id, new.name, new.description);
+    END
+    ''',
+    'products_fts_delete': '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description)
+        VALUES ('delete', old.product_id, old.name, old.description);
+    END
+    ''',
+    'products_fts_update': '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description)
+        VALUES ('delete', old.product_id, old.name, old.description);
+        INSERT INTO products_fts (rowid, name, description)
+        VALUES (new.product_id, new.name, new.description);
+    END
+    ''',
+}
+
+
+def create_product_search_index(conn):
+    """Create products_fts and the triggers that keep it in sync with products.
+    
+    Does nothing when FTS5 is not compiled in; Product.search then keeps
+    using its LIKE scan.
+    """
+    if not fts5_available(conn):
+        return
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, content='products', content_rowid='product_id'
+    )
+    ''')
+    for trigger_sql in PRODUCT_SEARCH_TRIGGERS.values():
+        conn.execute(trigger_sql)
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+
+def change_tracking(table):
+    """Statements that make every write to table bump its change_counters row.
+    
+    In-process caches compare the generation they were built from with the
+    current one to notice writes made by other connections and processes.
+    """
+    statements = [
+        '''CREATE TABLE IF NOT EXISTS change_counters (
+            table_name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )''',
+        f"INSERT OR IGNORE INTO change_counters (table_name) VALUES ('{table}')",
+    ]
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        statements.append(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_generation AFTER {event} ON {table} BEGIN
+            UPDATE change_counters SET generation = generation + 1 WHERE table_name = '{table}';
+        END
+        ''')
+    return statements
+
+
+def log_partition(name, schema=None):
+    """Return the DDL for a monthly partition of inventory_log.
+    
+    Partitions are sealed once written, so they carry every index the log
+    readers and reports might want. schema names an attached database to
+    create the partition in.
+    """
+    prefix = f'{schema}.' if schema else ''
+    return [
+        f'''CREATE TABLE IF NOT EXISTS {prefix}{name} (
+            log_id INTEGER PRIMARY KEY,
+            product_id INTEGER,
+            action TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            timestamp TIMESTAMP,
+            notes TEXT
+        )''',
+        f'CREATE INDEX IF NOT EXISTS {prefix}idx_{name}_product_timestamp '
+        f'ON {name} (product_id, timestamp)',
+        f'CREATE INDEX IF NOT EXISTS {prefix}idx_{name}_timestamp ON {name} (timestamp)',
+        f'CREATE INDEX IF NOT EXISTS {prefix}idx_{name}_report '
+        f'ON {name} (timestamp, action, product_id, quantity)',
+    ]
+
+
+# Schema migrations, applied in order. Each is a list of statements or a
+# function taking the connection. PRAGMA user_version records how many of
+# them have already run against a database file.
+MIGRATIONS = [
+    # 1: secondary indexes for the lookups and sort orders used in models.py
+    [
+        'CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)',
+        'CREATE INDEX IF NOT EXISTS idx_products_category ON products (category_id)',
+        'CREATE INDEX IF NOT EXISTS idx_inventory_log_product_timestamp '
+        'ON inventory_log (product_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_inventory_log_timestamp ON inventory_log (timestamp)',
+    ],
+    # 2: full-text index over product name and description
+    create_product_search_index,
+    # 3: optional stock-keeping unit, the natural key for bulk imports
+    [
+        'ALTER TABLE products ADD COLUMN sku TEXT',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_products_sku ON products (sku)',
+    ],
+    # 4: generation counter for the category cache in models.py
+    change_tracking('categories'),
+    # 5: periodic per-product stock checkpoints, and an archive for log rows
+    #    that have been folded into one
+    [
+        '''CREATE TABLE IF NOT EXISTS stock_snapshots (
+            product_id INTEGER NOT NULL,
+            taken_at TIMESTAMP NOT NULL,
+            quantity INTEGER NOT NULL,
+            last_log_id INTEGER NOT NULL,
+            PRIMARY KEY (product_id, taken_at)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_stock_snapshots_taken_at '
+        'ON stock_snapshots (taken_at, last_log_id)',
+        '''CREATE TABLE IF NOT EXISTS inventory_log_archive (
+            log_id INTEGER PRIMARY KEY,
+            product_id INTEGER,
+            action TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            timestamp TIMESTAMP,
+            notes TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_inventory_log_archive_product_timestamp '
+        'ON inventory_log_archive (product_id, timestamp)',
+    ],
+    # 6: per-product reorder point; the partial index holds only the products
+    #    currently at or below it, so low-stock lookups never scan the catalog
+    [
+        'ALTER TABLE products ADD COLUMN reorder_threshold INTEGER',
+        'CREATE INDEX IF NOT EXISTS idx_products_low_stock '
+        'ON products (quantity) WHERE quantity <= reorder_threshold',
+    ],
+    # 7: generation counters for the report cache in reports.py, and
+    #    covering indexes so log reports never touch the table rows
+    change_tracking('products') + change_tracking('inventory_log') + [
+        'CREATE INDEX IF NOT EXISTS idx_inventory_log_report '
+        'ON inventory_log (timestamp, action, product_id, quantity)',
+        'CREATE INDEX IF NOT EXISTS idx_inventory_log_archive_report '
+        'ON inventory_log_archive (timestamp, action, product_id, quantity)',
+    ],
+    # 8: registry of monthly inventory_log partitions (see LogPartition in
+    #    models.py); detached_to is set once a month is exported to a file
+    [
+        '''CREATE TABLE IF NOT EXISTS log_partitions (
+            month TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            first_log_id INTEGER NOT NULL,
+            last_log_id INTEGER NOT NULL,
+            detached_to TEXT
+        )''',
+    ],
+    # 9: highest spool sequence number each buffered log writer (audit_log.py)
+    #    has committed, so a restart knows which spooled entries to replay
+    [
+        '''CREATE TABLE IF NOT EXISTS log_spools (
+            path TEXT PRIMARY KEY,
+            flushed_seq INTEGER NOT NULL
+        )''',
+    ],
+    # 10: the storage profile chosen at initialization, whose per-connection
+    #     pragmas (synchronous, cache_size, ...) the models apply on connect
+    [
+        '''CREATE TABLE IF NOT EXISTS storage_settings (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )''',
+    ],
+    # 11: highest spool sequence number whose stock movement has committed,
+    #     written in the movement's own transaction; replay skips the rest
+    [
+        'ALTER TABLE log_spools ADD COLUMN committed_seq INTEGER',
+    ],
+]
+
+
+def migrate_database(conn):
+    """Run any migrations the database has not seen yet.
+    
+    Each migration commits together with its user_version bump (SQLite DDL
+    is transactional), so one that fails partway leaves no trace and runs
+    again in full next time. The version is read under the write lock, so
+    two processes initializing at once don't both apply a migration.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    while True:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= len(MIGRATIONS):
+                conn.commit()
+                return
+            statements = MIGRATIONS[version]
+            if callable(statements):
+                statements(conn)
+            else:
+                for statement in statements:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+# Function to initialize the database. A profile given here is saved in the
+# database and used by every connection the models open to it; None keeps
+# the saved one (or the default for a new database).
+def initialize_database(profile=None):
     # Check if database file exists
     db_exists = os.path.exists('inventory.db')
     
     # Connect to database (will create it if it doesn't exist)
     conn = sqlite3.connect('inventory.db')
+    apply_storage_profile(conn, profile or stored_storage_profile(conn) or DEFAULT_STORAGE_PROFILE)
     cursor = conn.cursor()
     
     # Create tables if they don't exist
@@ -45,6 +325,10 @@ def initialize_database():
     )
     ''')
     
+    migrate_database(conn)
+    if profile is not None:
+        save_storage_profile(conn, profile)
+    
     # If database was just created, insert some sample data
     if not db_exists:
         # Insert sample categories
@@ -0,0 +1,293 @@
+"""
+Per-method performance counters for the models.
+
+enable() wraps every public method of the model classes so each call
+records its latency (in a histogram), the rows it returned, and whether it
+raised. Calls slower than the slow-call threshold are kept as samples
+together with the SQL statements they ran and how long each took.
+Connection pool counters come from models.pool_stats().
+
+While disabled the original methods are in place, so instrumentation
+costs nothing. Iterator methods (iter_all and friends) are recorded once
+the caller finishes with the iterator, with the time spent producing rows.
+
+Usage:
+    import instrumentation
+    instrumentation.enable()
+    ...
+    print(instrumentation.format_report())
+    instrumentation.write_prometheus('inventory.prom')
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+import models
+from reports import Report
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+INSTRUMENTED_CLASSES = (models.Category, models.Product, models.InventoryLog,
+                        models.StockSnapshot, models.LogPartition, Report)
+
+# Statements run by the instrumented call in progress on this thread, as
+# (sql, seconds) pairs; None outside instrumented calls
+_local = threading.local()
+
+
+class MethodStats:
+    """Counters for one model method."""
+    
+    __slots__ = ('calls', 'errors', 'seconds', 'rows', 'buckets')
+    
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # The last one is +Inf
+
+
+class Registry:
+    """Collected counters and slow-call samples for every instrumented method."""
+    
+    def __init__(self, slow_threshold=0.1, slow_samples=50):
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self.methods = {}
+        self.slow_calls = deque(maxlen=slow_samples)
+    
+    def record(self, method, seconds, rows, ok, statements):
+        with self._lock:
+            stats = self.methods.get(method)
+            if stats is None:
+                stats = self.methods[method] = MethodStats()
+            stats.calls += 1
+            stats.errors += not ok
+            stats.seconds += seconds
+            stats.rows += rows
+            stats.buckets[bisect_left(BUCKETS, seconds)] += 1
+            if seconds >= self.slow_threshold:
+                self.slow_calls.append({
+                    'method': method, 'seconds': seconds,
+                    'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'statements': [(' '.join(sql.split()), elapsed) for sql, elapsed in statements],
+                })
+    
+    def reset(self):
+        with self._lock:
+            self.methods.clear()
+            self.slow_calls.clear()
+
+
+registry = Registry()
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that notes each statement's SQL and execution time for the current call."""
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            statements = getattr(_local, 'statements', None)
+            if statements is not None:
+                statements.append((sql, time.perf_counter() - start))
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            statements = getattr(_local, 'statements', None)
+            if statements is not None:
+                statements.append((sql, time.perf_counter() - start))
+
+
+def _row_count(result):
+    if isinstance(result, list):
+        return len(result)
+    return 1 if isinstance(result, (dict, models.Record)) else 0
+
+
+def _timed_rows(method, rows, elapsed, statements):
+    """Pass rows through, recording the method once the caller is done with them."""
+    count = 0
+    ok = False
+    try:
+        while True:
+            outer = getattr(_local, 'statements', None)
+            _local.statements = statements
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+                _local.statements = outer
+            count += 1
+            yield row
+        ok = True
+    finally:
+        # Stopping early (close or garbage collection) is not an error
+        registry.record(method, elapsed, count, ok or count > 0, statements)
+
+
+def _instrument(method, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outer = getattr(_local, 'statements', None)
+        statements = _local.statements = []
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = func(*args, **kwargs)
+            ok = True
+        finally:
+            elapsed = time.perf_counter() - start
+            _local.statements = outer
+            if outer is not None:
+                outer.extend(statements)  # Nested calls count towards the caller too
+            if not ok:
+                registry.record(method, elapsed, 0, False, statements)
+        if hasattr(result, '__next__'):
+            return _timed_rows(method, result, elapsed, statements)
+        registry.record(method, elapsed, _row_count(result), True, statements)
+        return result
+    wrapper.__wrapped_original__ = func
+    return wrapper
+
+
+def enable(slow_threshold=None, classes=INSTRUMENTED_CLASSES):
+    """Start recording calls to every public static method of classes."""
+    if slow_threshold is not None:
+        registry.slow_threshold = slow_threshold
+    for cls in classes:
+        for name, attr in list(vars(cls).items()):
+            if isinstance(attr, staticmethod) and not name.startswith('_') \
+                    and not hasattr(attr.__func__, '__wrapped_original__'):
+                setattr(cls, name, staticmethod(_instrument(f'{cls.__name__}.{name}',
+                                                            attr.__func__)))
+    models.set_cursor_factory(TimedCursor)
+
+
+def disable(classes=INSTRUMENTED_CLASSES):
+    """Put the original methods back; collected counters are kept."""
+    models.set_cursor_factory(None)
+    for cls in classes:
+        for name, attr in list(vars(cls).items()):
+            if isinstance(attr, staticmethod) and hasattr(attr.__func__, '__wrapped_original__'):
+                setattr(cls, name, staticmethod(attr.__func__.__wrapped_original__))
+
+
+def is_enabled():
+    return models._cursor_factory is TimedCursor
+
+
+def snapshot():
+    """Return all counters as plain data."""
+    with registry._lock:
+        methods = {method: {'calls': stats.calls, 'errors': stats.errors,
+                            'seconds': stats.seconds, 'rows': stats.rows,
+                            'buckets': list(stats.buckets)}
+                   for method, stats in registry.methods.items()}
+        slow_calls = list(registry.slow_calls)
+    return {'methods': methods, 'slow_calls': slow_calls, 'pools': models.pool_stats()}
+
+
+def _quantile(buckets, fraction):
+    """Upper bound of the histogram bucket holding the given quantile."""
+    target = fraction * sum(buckets)
+    seen = 0
+    for bound, count in zip(BUCKETS + (float('inf'),), buckets):
+        seen += count
+        if seen >= target:
+            return bound
+    return float('inf')
+
+
+def format_report():
+    """Human-readable table of the counters, busiest methods first."""
+    data = snapshot()
+    lines = [f"{'Method':<34} {'calls':>8} {'errors':>6} {'avg ms':>8} {'p95 <=ms':>9} {'rows':>9}",
+             "-" * 79]
+    by_time = sorted(data['methods'].items(), key=lambda item: -item[1]['seconds'])
+    for method, stats in by_time:
+        average = stats['seconds'] / stats['calls'] * 1000 if stats['calls'] else 0
+        p95 = _quantile(stats['buckets'], 0.95) * 1000
+        lines.append(f"{method:<34} {stats['calls']:>8} {stats['errors']:>6} {average:>8.2f} "
+                     f"{p95:>9.2f} {stats['rows']:>9}")
+    if not by_time:
+        lines.append("No calls recorded.")
+    
+    lines.append("")
+    for db_file, pool in data['pools'].items():
+        lines.append(f"Pool {db_file}: {pool['opened']} connections opened, "
+                     f"{pool['acquired']} checkouts, {pool['idle']}/{pool['size']} idle")
+    
+    if data['slow_calls']:
+        lines.append(f"\nSlowest recent calls (>= {registry.slow_threshold * 1000:.0f} ms):")
+        for sample in sorted(data['slow_calls'], key=lambda s: -s['seconds'])[:10]:
+            lines.append(f"  {sample['at']}  {sample['method']}  {sample['seconds'] * 1000:.1f} ms")
+            for sql, seconds in sample['statements']:
+                lines.append(f"      {seconds * 1000:8.2f} ms  {sql[:100]}")
+    return '\n'.join(lines)
+
+
+def prometheus_text():
+    """Counters in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = [
+        '# HELP inventory_model_calls_total Calls to each model method.',
+        '# TYPE inventory_model_calls_total counter',
+    ]
+    for method, stats in sorted(data['methods'].items()):
+        lines.append(f'inventory_model_calls_total{{method="{method}"}} {stats["calls"]}')
+    lines += ['# HELP inventory_model_errors_total Model method calls that raised.',
+              '# TYPE inventory_model_errors_total counter']
+    for method, stats in sorted(data['methods'].items()):
+        lines.append(f'inventory_model_errors_total{{method="{method}"}} {stats["errors"]}')
+    lines += ['# HELP inventory_model_rows_total Rows returned by each model method.',
+              '# TYPE inventory_model_rows_total counter']
+    for method, stats in sorted(data['methods'].items()):
+        lines.append(f'inventory_model_rows_total{{method="{method}"}} {stats["rows"]}')
+    lines += ['# HELP inventory_model_call_duration_seconds Latency of model method calls.',
+              '# TYPE inventory_model_call_duration_seconds histogram']
+    for method, stats in sorted(data['methods'].items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), stats['buckets']):
+            cumulative += count
+            lines.append(f'inventory_model_call_duration_seconds_bucket'
+                         f'{{method="{method}",le="{bound}"}} {cumulative}')
+        lines.append(f'inventory_model_call_duration_seconds_sum{{method="{method}"}} '
+                     f'{stats["seconds"]:.6f}')
+        lines.append(f'inventory_model_call_duration_seconds_count{{method="{method}"}} '
+                     f'{stats["calls"]}')
+    for name, key, help_text in (('opened', 'opened', 'Database connections opened by the pool.'),
+                                 ('checkouts', 'acquired', 'Connections handed out by the pool.')):
+        lines += [f'# HELP inventory_db_connections_{name}_total {help_text}',
+                  f'# TYPE inventory_db_connections_{name}_total counter']
+        for db_file, pool in sorted(data['pools'].items()):
+            lines.append(f'inventory_db_connections_{name}_total{{database="{db_file}"}} {pool[key]}')
+    lines += ['# HELP inventory_db_connections_idle Idle connections in the pool.',
+              '# TYPE inventory_db_connections_idle gauge']
+    for db_file, pool in sorted(data['pools'].items()):
+        lines.append(f'inventory_db_connections_idle{{database="{db_file}"}} {pool["idle"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    """Write prometheus_text() to path atomically, for a textfile collector."""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
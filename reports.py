@@ -0,0 +1,230 @@
+"""
+Aggregate reports over products and the inventory log.
+
+All grouping and summing runs inside SQLite, so a report reads one small
+result set instead of pulling every product or log row into Python.
+Movement reports cover the live log, its monthly partitions and rows
+already compacted into inventory_log_archive.
+
+Results are cached in-process. Each entry remembers the generations of the
+tables it was computed from (see change_tracking in db_schema.py) and is
+refreshed once any of them has changed, including changes made by other
+processes. Log rows are only ever appended (rotation and compaction move
+them between tables unchanged), so a log report is refreshed by
+aggregating just the rows added since it was last computed and adding them
+to its totals. Detaching a partition removes rows, and forces a full
+recomputation instead.
+"""
+
+import threading
+from collections import OrderedDict
+
+from models import Database, log_tables, newest_log_id, sql_timestamp
+
+# SQL expressions mapping a log timestamp to the start of its period
+PERIODS = {
+    'day': "date(timestamp)",
+    'week': "date(timestamp, 'weekday 0', '-6 days')",
+    'month': "date(timestamp, 'start of month')",
+}
+
+# Log actions that record bookkeeping rather than goods moving in or out
+NON_MOVEMENT_ACTIONS = ('CREATE', 'INITIAL', 'IMPORT', 'DELETE')
+
+# Most report results kept; every distinct start/end window is an entry of
+# its own, so the least recently used are dropped beyond this
+REPORT_CACHE_SIZE = 256
+
+# Log rows of one table with start <= timestamp < end and low < log_id <= high.
+# {ts} is 'timestamp', or '+timestamp' to keep SQLite off the timestamp
+# index when the log_id range is the narrower one.
+LOG_ROWS = '''
+    SELECT product_id, action, quantity, timestamp FROM {table}
+    WHERE {ts} >= ? AND {ts} < ? AND log_id > ? AND log_id <= ?
+'''
+
+
+def _window(start, end):
+    """Timestamp bounds for LOG_ROWS; missing bounds leave that side open."""
+    start = '' if start is None else sql_timestamp(start)
+    end = '9999-12-31 23:59:59' if end is None else sql_timestamp(end)
+    return (start, end)
+
+
+class ReportCache:
+    """Report results keyed by report name and arguments.
+    
+    Each entry is stored with the generations of its source tables and
+    served until any of them moves on. At most max_entries are kept,
+    evicting the least recently used.
+    """
+    
+    def __init__(self, max_entries=REPORT_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _generation(db, table):
+        db.cursor.execute('SELECT generation FROM change_counters WHERE table_name = ?', (table,))
+        return db.cursor.fetchone()[0]
+    
+    def get(self, tables, key, compute):
+        """Return compute(db), recomputed whenever any of tables' generations changes."""
+        with Database() as db:
+            generation = tuple(self._generation(db, table) for table in tables)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == generation:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return [dict(row) for row in entry[1]]
+                self.misses += 1
+            
+            rows = compute(db)
+        self._store(key, (generation, rows))
+        return [dict(row) for row in rows]
+    
+    def log_totals(self, key, select, group_by, window):
+        """Per-group sums over the log, brought up to date incrementally.
+        
+        select lists the grouping expressions followed by additive
+        aggregates (COUNT/SUM) over LOG_ROWS within window. Returns a dict
+        mapping each group tuple to its list of totals.
+        """
+        with Database() as db:
+            generation = self._generation(db, 'inventory_log')
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == generation:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return entry[2]
+                self.misses += 1
+            tables = log_tables(db) + ['inventory_log_archive']
+            if entry is not None and set(entry[3]) <= set(tables):
+                last_log_id, totals = entry[1], dict(entry[2])
+            else:
+                entry, last_log_id, totals = None, 0, {}
+            
+            newest = newest_log_id(db)
+            bounds = window + (last_log_id, newest)
+            ts = '+timestamp' if entry is not None else 'timestamp'
+            rows = ' UNION ALL '.join(LOG_ROWS.format(table=table, ts=ts) for table in tables)
+            db.cursor.execute(f'SELECT {select} FROM ({rows}) GROUP BY {group_by}',
+                              bounds * len(tables))
+            width = group_by.count(',') + 1
+            for row in db.cursor.fetchall():
+                group, values = tuple(row[:width]), row[width:]
+                current = totals.get(group)
+                totals[group] = ([a + b for a, b in zip(current, values)]
+                                 if current else list(values))
+        self._store(key, (generation, newest, totals, tables))
+        return totals
+    
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Return hit/miss counters for the cache."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'evictions': self.evictions}
+
+
+_report_cache = ReportCache()
+
+
+class Report:
+    @staticmethod
+    def valuation_by_category():
+        """Stock value (price x quantity) per category, highest value first.
+        
+        Products without a category are grouped under category_id None.
+        """
+        def compute(db):
+            db.cursor.execute('''
+                SELECT v.category_id, c.name as category_name,
+                       v.products, v.units, v.value
+                FROM (
+                    SELECT category_id, COUNT(*) AS products,
+                           SUM(quantity) AS units, SUM(price * quantity) AS value
+                    FROM products
+                    GROUP BY category_id
+                ) v
+                LEFT JOIN categories c ON c.category_id = v.category_id
+                ORDER BY v.value DESC
+            ''')
+            return [dict(row) for row in db.cursor.fetchall()]
+        
+        # The rows carry category names, so a renamed category invalidates them too
+        return _report_cache.get(('products', 'categories'), ('valuation_by_category',), compute)
+    
+    @staticmethod
+    def movements_by_period(period='day', start=None, end=None):
+        """Units moved per action per day, week or month.
+        
+        start and end are datetimes or SQLite timestamp strings bounding the
+        log entries included (start inclusive, end exclusive). Each row has
+        'period' (the date the period starts on), 'action', 'entries',
+        'units' (sum of absolute quantities) and 'net' (signed sum).
+        """
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        window = _window(start, end)
+        totals = _report_cache.log_totals(
+            ('movements_by_period', period) + window,
+            f'{PERIODS[period]}, action, COUNT(*), SUM(ABS(quantity)), SUM(quantity)',
+            '1, 2', window)
+        return [{'period': period_start, 'action': action,
+                 'entries': entries, 'units': units, 'net': net}
+                for (period_start, action), (entries, units, net) in sorted(totals.items())]
+    
+    @staticmethod
+    def top_movers(limit=10, start=None, end=None, action=None):
+        """Products with the most units moved, busiest first.
+        
+        Counts every action except the bookkeeping ones in
+        NON_MOVEMENT_ACTIONS, or only action if given (e.g. 'SALE').
+        """
+        window = _window(start, end)
+        totals = _report_cache.log_totals(
+            ('product_movements',) + window,
+            'product_id, action, SUM(ABS(quantity)), COUNT(*)', 'product_id, action', window)
+        
+        movers = {}
+        for (product_id, logged_action), (units, movements) in totals.items():
+            if logged_action == action or (action is None
+                                           and logged_action not in NON_MOVEMENT_ACTIONS):
+                total = movers.setdefault(product_id, [0, 0])
+                total[0] += units
+                total[1] += movements
+        top = sorted(movers.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+        
+        names = {}
+        if top:
+            with Database() as db:
+                placeholders = ', '.join('?' * len(top))
+                db.cursor.execute(f'SELECT product_id, name FROM products '
+                                  f'WHERE product_id IN ({placeholders})',
+                                  [product_id for product_id, _ in top])
+                names = dict(db.cursor.fetchall())
+        return [{'product_id': product_id, 'name': names.get(product_id),
+                 'units': units, 'movements': movements}
+                for product_id, (units, movements) in top]
+    
+    @staticmethod
+    def cache_stats():
+        return _report_cache.stats()